@@ -0,0 +1,101 @@
+"""
+Guard the cold start time of the public entry points with `python -X importtime`.
+
+Usage:
+    python -m benchmarks.import_time [--runs 7] [--tolerance 0.25] [--update-baseline]
+
+Each module is imported in a fresh interpreter `--runs` times and the fastest cumulative
+time is reported. The script exits with status 1 if a module imports one of its forbidden
+dependencies, or if a budgeted module takes more than `--tolerance` longer than its time in
+the stored baseline. Import times depend on the machine, so record the baseline on the
+machine the check runs on with `--update-baseline`.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "import_time_baseline.json")
+
+# Module -> the heavy modules it must not import
+GUARDS = {
+    "src.public": ("aiohttp", "asyncio", "src.utils", "src.client"),
+    "src.client": ("aiohttp", "asyncio", "src.orders"),
+    "src.utils": ("aiohttp", "asyncio"),
+}
+
+# The modules whose import time is compared against the baseline
+BUDGETED = ("src.public", "src.client")
+
+
+def measure(module: str) -> tuple[int, set]:
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        The cumulative import time of the module in microseconds, and the names of all the imported modules.
+
+    Raises:
+        None
+    """
+
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    cumulative, imported = 0, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line.split("|")
+        imported.add(name.strip())
+        if name.strip() == module:
+            cumulative = int(total)
+    return cumulative, imported
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="The allowed slowdown relative to the baseline, e.g. `0.25` for 25%%.")
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="Store the measured times as the new baseline instead of checking them.")
+    args = parser.parse_args(argv)
+
+    failed = False
+    bests = {}
+    for module, forbidden in GUARDS.items():
+        results = [measure(module) for _ in range(args.runs)]
+        best = bests[module] = min(total for total, _ in results)
+        leaked = sorted(set(forbidden) & results[0][1])
+        print(f"{module:<12} {best / 1000:8.1f} ms")
+        if leaked:
+            print(f"  imports {', '.join(leaked)}")
+            failed = True
+    if args.update_baseline:
+        with open(BASELINE, "w", encoding="utf-8") as file:
+            json.dump({module: round(bests[module] / 1000, 1) for module in BUDGETED}, file, indent=4)
+            file.write("\n")
+        print(f"baseline written to {os.path.relpath(BASELINE, ROOT)}")
+        return 1 if failed else 0
+    with open(BASELINE, encoding="utf-8") as file:
+        baseline = json.load(file)
+    for module in BUDGETED:
+        budget = baseline[module] * (1 + args.tolerance)
+        if bests[module] / 1000 > budget:
+            print(f"{module} takes {bests[module] / 1000:.1f} ms, over its {budget:.1f} ms budget "
+                  f"({baseline[module]} ms baseline + {args.tolerance:.0%})")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
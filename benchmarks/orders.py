@@ -0,0 +1,147 @@
+"""
+Measure the latency of each stage of the order methods against a local stand-in server.
+
+Usage:
+    python -m benchmarks.orders [--orders 2000] [--concurrency 4]
+
+Stages:
+    render:   building the order body from the pre-serialized template
+    send:     from the start of the request until the body is written
+    server:   from the body being written until the response headers arrive
+    decode:   from the response headers until the JSON is decoded
+    total:    the whole `place_order` call
+
+The script fails if the warm-up doesn't open exactly `--concurrency` connections, or if the
+orders open any connection of their own instead of reusing the warmed-up ones.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import statistics
+import time
+
+from aiohttp import TraceConfig, web
+
+from src.client import Client
+from src.orders import order_template
+from src.utils import Symbol, OrderType, Execution
+
+# The trace callbacks run in the task that sent the request, so they can find its timings here
+_timings = contextvars.ContextVar("timings")
+
+
+async def _order(request: web.Request) -> web.Response:
+    body = await request.json()
+    return web.json_response({
+        "status": "ok",
+        "order": {"id": 1, "type": body.get("type"), "amount": body.get("amount"),
+                  "price": body.get("price"), "status": "Active"}})
+
+
+async def _cancel(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response({"status": "ok", "updatedStatus": "Canceled"})
+
+
+async def _stats(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", "stats": {}})
+
+
+def _summary(name: str, samples: list) -> str:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (f"{name:<8} mean {statistics.fmean(samples) * 1e6:9.1f} us   "
+            f"p50 {p50 * 1e6:9.1f} us   p99 {p99 * 1e6:9.1f} us")
+
+
+async def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.orders")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    app = web.Application()
+    app.router.add_post("/market/orders/add", _order)
+    app.router.add_post("/market/orders/update-status", _cancel)
+    app.router.add_get("/market/stats", _stats)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    stages = {"render": [], "send": [], "server": [], "decode": [], "total": []}
+    connections = {"created": 0, "reused": 0}
+    trace = TraceConfig()
+
+    async def on_request_start(session, context, params):
+        _timings.get({})["start"] = time.perf_counter()
+
+    async def on_request_chunk_sent(session, context, params):
+        _timings.get({})["sent"] = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        _timings.get({})["headers"] = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        connections["created"] += 1
+
+    async def on_connection_reuseconn(session, context, params):
+        connections["reused"] += 1
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace.on_request_end.append(on_request_end)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_connection_reuseconn)
+
+    Client.REST_API_BASE_URL = f"http://127.0.0.1:{port}"
+    client = Client("benchmark", order_connections=args.concurrency, trace_configs=[trace])
+    template = order_template(Symbol.BTCIRT, OrderType.BUY, Execution.LIMIT)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def place(i: int) -> None:
+        async with semaphore:
+            timings = {}
+            _timings.set(timings)
+            start = time.perf_counter()
+            await client.place_order(
+                Symbol.BTCIRT, OrderType.BUY, "0.001", 1_000_000_000 + i * 10,
+                client_order_id=f"bench-{i}")
+            end = time.perf_counter()
+            stages["send"].append(timings["sent"] - timings["start"])
+            stages["server"].append(timings["headers"] - timings["sent"])
+            stages["decode"].append(end - timings["headers"])
+            stages["total"].append(end - start)
+
+    try:
+        await client.warm_up_orders()
+        warmed = connections["created"]
+        assert warmed == args.concurrency, \
+            f"warm-up opened {warmed} connections instead of {args.concurrency}"
+        for i in range(args.orders):
+            start = time.perf_counter()
+            template.render("0.001", 1_000_000_000 + i * 10, f"bench-{i}")
+            stages["render"].append(time.perf_counter() - start)
+        started = time.perf_counter()
+        await asyncio.gather(*(place(i) for i in range(args.orders)))
+        elapsed = time.perf_counter() - started
+        await client.cancel_orders(*range(args.concurrency))
+        assert connections["created"] == warmed, \
+            f"the orders opened {connections['created'] - warmed} connections after the warm-up"
+        assert connections["reused"], "the orders never reused a warmed-up connection"
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    for name, samples in stages.items():
+        print(_summary(name, samples))
+    print(f"throughput {args.orders / elapsed:.0f} orders/s, "
+          f"connections created {connections['created']} (all during warm-up), "
+          f"reused {connections['reused']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,17 @@
 # Originally published by Hamed Nasimi at https://github.com/hamednasimi/nobitex-python-wrapper
 
-import aiohttp
-from .utils import (Symbol, Path, Currency, Resolution, TradeType)
+import json
+import time
+from typing import TYPE_CHECKING, get_args
+
+from .utils import (
+    Symbol, Path, Currency, Resolution, TradeType, OrderType, Execution, StalePolicy)
+from .models import (
+    Model, OrderBook, OrderBooks, Trades, MarketStats, Wallets, WalletList, Transactions)
+from .clock import ClockEstimator, StaleDataError, parse_http_date, DATE_RESOLUTION
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # TODO Make the exception class
 # TODO Create the rate limiter
@@ -11,6 +21,19 @@ from .utils import (Symbol, Path, Currency, Resolution, TradeType)
 # TODO Move each of the major parts of the code \
     # (user related, account related, ...) into their own discrete classes
 
+
+def _freeze(value):
+    """
+    Convert request arguments into a hashable value for the in-flight request key.
+    """
+    
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(i) for i in value)
+    return value
+
+
 class Client:
     """
     The class for handling the setup and configuration of the client object.
@@ -27,7 +50,13 @@ class Client:
         api_token: str = None,
         bot_mode: bool = True,
         bot_name: str = 'WrapperBot',
-        rate_limiter: bool = True
+        rate_limiter: bool = True,
+        singleflight: bool = True,
+        markets = None,
+        order_connections: int = 4,
+        trace_configs: list = None,
+        max_age: float = None,
+        on_stale: StalePolicy = "refetch"
         ) -> None:
         """
        Initializ es the client with the given API token and sets up the necessary resources.
@@ -37,56 +66,156 @@ class Client:
             bot_mode: Whether to run in bot mode or not. Defaults to `True`.
             bot_name: The name of the bot. Defaults to `'WrapperBot'`.
             rate_limiter: Whether to use the built-in rate limiter. Defaults to `True`.
+            singleflight: Whether concurrent identical GET requests share a single \
+HTTP request. Defaults to `True`. The number of requests saved this way is \
+counted in `requests_deduplicated`.
+            markets: A `markets.MarketRegistry` to validate orders against before sending them.
+            order_connections: The number of kept-alive connections reserved for order requests. \
+Defaults to `4`.
+            trace_configs: `aiohttp.TraceConfig`s to attach to the sessions, e.g. for latency measurements.
+            max_age: The default maximum age in seconds of order books and trades. \
+Defaults to `None` (no limit).
+            on_stale: What to do with data older than `max_age`: `'refetch'` it once \
+and raise if it is still stale, or `'raise'` right away. Defaults to `'refetch'`.
             
         Returns:
             None
             
         Raises:
-            None
+            ValueError: If `on_stale` is not `'refetch'` or `'raise'`.
         """
         
+        # Imported here rather than at module level, so importing the client stays cheap
+        import aiohttp
+        
+        self.singleflight = singleflight
+        self.requests_deduplicated = 0
+        self.__in_flight = {}
+        self.markets = markets
+        self.max_age = max_age
+        self.on_stale = on_stale
+        self.clock = ClockEstimator()
+        self.__api_token = api_token
+        self.__order_connections = order_connections
+        self.__order_session = None
+        self.__trace_configs = trace_configs
         if api_token:
             self.has_token = True
             self.__session = aiohttp.ClientSession(
                 base_url=Client.REST_API_BASE_URL,
-                headers={"Authorization": f"Token {api_token}"})
+                headers={"Authorization": f"Token {api_token}"},
+                trace_configs=trace_configs)
         else:
             self.has_token = False
-            self.__session = aiohttp.ClientSession(base_url=Client.REST_API_BASE_URL)
+            self.__session = aiohttp.ClientSession(
+                base_url=Client.REST_API_BASE_URL,
+                trace_configs=trace_configs)
+        
+    @property
+    def on_stale(self) -> StalePolicy:
+        """
+        What to do with market data older than `max_age`: `'refetch'` or `'raise'`.
+        """
         
+        return self.__on_stale
+    
+    @on_stale.setter
+    def on_stale(self, value: StalePolicy) -> None:
+        if value not in get_args(StalePolicy):
+            raise ValueError(f"`on_stale` must be one of {get_args(StalePolicy)}, got `{value!r}`.")
+        self.__on_stale = value
+    
     # Methods
     
     async def close(self) -> None:
         """
-        The function to run when closing the aiohttp session.
+        The function to run when closing the aiohttp sessions.
         """
         await self.__session.close()
+        if self.__order_session is not None:
+            await self.__order_session.close()
         
     async def __get(
         self,
         url: str,
         params: dict = None,
         headers: dict = None,
-        data: dict = None
-        ) -> dict:
+        data: dict = None,
+        with_time: bool = False
+        ) -> dict | tuple[dict, float | None]:
         """
         The main coroutine for handling GET requests.
         
+        When `singleflight` is enabled, a call with the same URL, params, headers \
+and data as a request that is still in flight waits for that request \
+instead of sending a new one, and every caller receives the same `dict`.
+        An error raised by the shared request is raised in every caller, \
+and the next call after it completes sends a new request.
+        Cancelling a caller only cancels the shared request when no other caller is waiting for it.
+        
         Args:
             url: The URL of the API endpoint to call.
             params: The `dict` that will get converted to query string.
+            with_time: Whether to also return the local unix time the server sent the response at, \
+estimated from its `Date` header (`None` without the header).
             
         Returns:
-            A `dict` containing the response.
+            A `dict` containing the response, or a `(dict, time)` tuple with `with_time`.
         """
         
+        if not self.singleflight:
+            response = await self.__send_get(url, params, headers, data)
+            return response if with_time else response[0]
+        # Imported here rather than at module level, so importing the client stays cheap
+        import asyncio
+        key = ("GET", url, _freeze(params), _freeze(headers), _freeze(data))
+        entry = self.__in_flight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self.__send_get(url, params, headers, data))
+            entry = self.__in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: self.__forget(key, entry))
+        else:
+            self.requests_deduplicated += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            response = await asyncio.shield(task)
+            return response if with_time else response[0]
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not task.done():
+                # Later callers must start a new request instead of joining the cancelled one
+                self.__forget(key, entry)
+                task.cancel()
+
+    def __forget(self, key: tuple, entry: list) -> None:
+        if self.__in_flight.get(key) is entry:
+            del self.__in_flight[key]
+    
+    async def __send_get(
+        self,
+        url: str,
+        params: dict = None,
+        headers: dict = None,
+        data: dict = None
+        ) -> tuple[dict, float | None]:
+        """
+        Send a GET request and decode the response, along with the local unix time \
+the server sent it at (see `__get`).
+        """
+        
+        sent = time.time()
         response = await self.__session.get(
             f"{url}",
             params=params,
             headers=headers,
             data=str(data))
+        date = parse_http_date(response.headers.get("Date"))
+        # Against the estimate from the earlier responses, since this one moves it towards its own date
+        generated = None if date is None else date + DATE_RESOLUTION / 2 - self.clock.offset
+        self.clock.observe(sent, time.time(), date)
         print(response.url)
-        return await response.json()
+        return await response.json(), generated
     
     async def __post(
         self,
@@ -106,11 +235,13 @@ class Client:
             A `dict` containing the response.
         """
         
+        sent = time.time()
         response = await self.__session.post(
             f"{url}",
             params=params,
             headers=headers,
             data=str(data))
+        self.clock.observe(sent, time.time(), parse_http_date(response.headers.get("Date")))
         return await response.json()
     
     async def __delete(
@@ -139,10 +270,69 @@ class Client:
             )
         return await response.json()
     
+    def __stamp(self, result: Model, generated: float = None) -> Model:
+        """
+        Feed the server timestamps of a market data result to the clock \
+and stamp the result with its estimated age.
+        
+        The age is measured from the `lastUpdate` of the response, or else from the middle of \
+the second in its `Date` header, which makes it accurate to about half a second. \
+The `Date` header is compared against the clock estimate from the earlier responses, \
+or against the local clock for the first one. \
+The time since the newest trade of a `Trades` is stamped separately.
+        """
+        
+        now = time.time()
+        if isinstance(result, Trades) and result.last_trade_time:
+            timestamp = result.last_trade_time / 1000
+            self.clock.observe_timestamp(now, timestamp)
+            result.stamp_last_trade(self.clock.age(timestamp))
+        if result.last_update:
+            timestamp = result.last_update / 1000
+            self.clock.observe_timestamp(now, timestamp)
+            result.stamp(self.clock.age(timestamp))
+        elif generated is not None:
+            result.stamp(max(0.0, now - generated))
+        return result
+    
+    async def __market_data(
+        self,
+        url: str,
+        model: type,
+        max_age: float = None
+        ) -> Model:
+        """
+        Fetch market data and check its age against `max_age` (or the client's `max_age`).
+        
+        Args:
+            url: The URL of the API endpoint to call.
+            model: The model class to wrap the response in.
+            max_age: The maximum age in seconds.
+            
+        Returns:
+            The stamped model.
+            
+        Raises:
+            StaleDataError: If the data is still too old after applying `on_stale`.
+        """
+        
+        max_age = self.max_age if max_age is None else max_age
+        response, generated = await self.__get(url, with_time=True)
+        result = self.__stamp(model(response), generated)
+        if max_age is None or result.age is None or result.age <= max_age:
+            return result
+        if self.on_stale == "refetch":
+            response, generated = await self.__get(url, with_time=True)
+            result = self.__stamp(model(response), generated)
+            if result.age is None or result.age <= max_age:
+                return result
+        raise StaleDataError(result.age, max_age)
+    
     async def get_order_book(
         self,
-        symbol: Symbol
-        ) -> dict:
+        symbol: Symbol,
+        max_age: float = None
+        ) -> OrderBook | OrderBooks:
         """
         Get the order book for a given symbol or all the available symbols.
         
@@ -152,20 +342,27 @@ class Client:
         Args:
             Symbol (symbol): The symbol to get the order book for.
             To get the result for all symbols use `Symbol.ALL`.
+            max_age: The maximum age of the book in seconds. \
+Defaults to the client's `max_age`. Not checked for `Symbol.ALL`.
 
         Returns:
-            The order book data as a `dict`.
+            The order book data as an `OrderBook`,
+            or as an `OrderBooks` for `Symbol.ALL`.
             
         Raises:
-            None
+            StaleDataError: If the book is older than `max_age`.
         """
         
-        return await self.__get(f"{Path.GET_ORDER_BOOK.value}{symbol.value}")
+        if symbol == Symbol.ALL:
+            return OrderBooks(await self.__get(f"{Path.GET_ORDER_BOOK.value}{symbol.value}"))
+        return await self.__market_data(
+            f"{Path.GET_ORDER_BOOK.value}{symbol.value}", OrderBook, max_age)
 
     async def get_market_depth(
         self,
-        symbol: Symbol
-        ) -> dict:
+        symbol: Symbol,
+        max_age: float = None
+        ) -> OrderBook:
         """
         Get the market depth for a given symbol.
         
@@ -175,22 +372,25 @@ class Client:
         Args:
             Symbol (symbol): The symbol to get the market depth for.
             Can't pass `Symbol.ALL` as the argument.
+            max_age: The maximum age of the depth in seconds. Defaults to the client's `max_age`.
 
         Returns:
-            The market depth data as a `dict`.
+            The market depth data as an `OrderBook`.
             
         Raises:
-            None
+            StaleDataError: If the depth is older than `max_age`.
         """
         if symbol == Symbol.ALL:
             raise ValueError("Can't get the market depth for all symbols at once.\
 Consider fetching them by calling this method for each individual symbol.")
-        return await self.__get(f"{Path.GET_MARKET_DEPTH.value}{symbol.value}")
+        return await self.__market_data(
+            f"{Path.GET_MARKET_DEPTH.value}{symbol.value}", OrderBook, max_age)
     
     async def get_trades(
         self,
-        symbol: Symbol
-        ) -> dict:
+        symbol: Symbol,
+        max_age: float = None
+        ) -> Trades:
         """
         Get the list of trades for a given symbol.
         
@@ -200,24 +400,36 @@ Consider fetching them by calling this method for each individual symbol.")
         Args:
             Symbol (symbol): The symbol to get the list of trades for.
             Can't pass `Symbol.ALL` as the argument.
+            max_age: The maximum age of the response in seconds. \
+Defaults to the client's `max_age`. The response has no `lastUpdate`, so its age \
+comes from the `Date` header and `max_age` can't be less than one second. \
+A quiet market doesn't make the response stale, \
+the time since the newest trade is available as `Trades.last_trade_age`.
 
         Returns:
-            The list of trades as a `dict`.
+            The list of trades as a `Trades`.
             
         Raises:
-            None
+            ValueError: If `max_age` is less than the one second resolution of the `Date` header.
+            StaleDataError: If the response is older than `max_age`.
         """
         
         if symbol == Symbol.ALL:
             raise ValueError("Can't get the trades data for all symbols at once.\
 Consider fetching them by calling this method for each individual symbol.")
-        return await self.__get(f"{Path.GET_TRADES.value}{symbol.value}")
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is not None and max_age < DATE_RESOLUTION:
+            raise ValueError(f"The age of trades is only known to {DATE_RESOLUTION:g}s \
+from the `Date` header, so `max_age` can't be {max_age:g}s. \
+Pass a larger `max_age` to `get_trades`.")
+        return await self.__market_data(
+            f"{Path.GET_TRADES.value}{symbol.value}", Trades, max_age)
     
     async def get_market_stats(
         self,
         *source_currency: tuple[Currency, ...],
         destination_currency: Currency
-        ) -> dict:
+        ) -> MarketStats:
         """
         Get the latest market stats for one/multiple source(s) and one destination currency.
         
@@ -229,16 +441,16 @@ Consider fetching them by calling this method for each individual symbol.")
             destination_currency (dstCurrency): The destination currency.
 
         Returns:
-            The market stats as a `dict`.
+            The market stats as a `MarketStats`.
             
         Raises:
             None
         """
         
         sources = ",".join(i.value for i in source_currency)
-        return await self.__get(
+        return MarketStats(await self.__get(
             f"{Path.GET_MARKET_STATS.value}",
-            params={"srcCurrency": sources, "dstCurrency": destination_currency.value})
+            params={"srcCurrency": sources, "dstCurrency": destination_currency.value}))
         
     async def ohlcv(
         self,
@@ -301,6 +513,26 @@ Consider fetching them by calling this method for each individual symbol.")
         return await self.__post(
             f"{Path.GET_GLOBAL_MARKET_STATS.value}")
         
+    async def get_options(self) -> dict:
+        """
+        Get the exchange options including the listed currencies and \
+the amount and price precision of every market.
+        
+        Rate limit: N/A
+        Token: Not required
+
+        Args:
+            None
+
+        Returns:
+            The exchange options as a `dict`.
+            
+        Raises:
+            None
+        """
+        
+        return await self.__get(Path.GET_OPTIONS.value)
+        
     async def get_user_profile(self) -> dict:
         """
         Get the user info including card info, bank account info etc.
@@ -473,7 +705,7 @@ Initialize the client using your API token as such: \
         
     async def get_wallet_list(
         self
-        ) -> dict:
+        ) -> WalletList:
         """
         Get the list of wallets in the user account.
         
@@ -484,15 +716,15 @@ Initialize the client using your API token as such: \
             None
 
         Returns:
-            `dict` containing the user wallets.
+            `WalletList` containing the user wallets.
         
         Raises:
             None
         """
         
         if self.has_token:
-            return await self.__get(
-                Path.GET_WALLET_LIST.value)
+            return WalletList(await self.__get(
+                Path.GET_WALLET_LIST.value))
         else:
             raise Exception("The client does not have a token! \
 Initialize the client using your API token as such: \
@@ -502,7 +734,7 @@ Initialize the client using your API token as such: \
         self,
         *currencies: tuple[Currency, ...],
         wallet_type: TradeType = TradeType.SPOT
-        ) -> dict:
+        ) -> Wallets:
         """
         Get the list of wallets in the user account.
         By default returns spot wallets.
@@ -516,7 +748,7 @@ Initialize the client using your API token as such: \
             wallet_type needs to be a keyword argument e.g. `wallet_type=TradeType.MARGIN`.
 
         Returns:
-            `dict` containing the user wallets.
+            `Wallets` containing the user wallets.
         
         Raises:
             None
@@ -528,9 +760,9 @@ Initialize the client using your API token as such: \
         if currencies:
             params.update({"currencies": ",".join(i.value for i in currencies)})
         if self.has_token:
-            return await self.__get(
+            return Wallets(await self.__get(
                 Path.GET_WALLETS.value,
-                params=params)
+                params=params))
         else:
             raise Exception("The client does not have a token! \
 Initialize the client using your API token as such: \
@@ -570,7 +802,7 @@ Initialize the client using your API token as such: \
     async def get_transactions(
         self,
         wallet_ID: int
-        ) -> dict:
+        ) -> Transactions:
         """
         Get the latest transactions to/from the given wallet.
         
@@ -581,16 +813,16 @@ Initialize the client using your API token as such: \
             wallet_ID: The ID of the wallet.
 
         Returns:
-            `dict` containing the list of transactions and request status.
+            `Transactions` containing the list of transactions and request status.
         
         Raises:
             None
         """
         
         if self.has_token:
-            return await self.__post(
+            return Transactions(await self.__post(
                 Path.GET_TRANSACTIONS.value,
-                params={"wallet": int(wallet_ID)})
+                params={"wallet": int(wallet_ID)}))
         else:
             raise Exception("The client does not have a token! \
 Initialize the client using your API token as such: \
@@ -721,3 +953,216 @@ Initialize the client using your API token as such: \
 Initialize the client using your API token as such: \
 `client = Client('yourTOKENhereHEX0000000000')`")
         '''
+
+    # Orders
+
+    def __open_order_session(self) -> "aiohttp.ClientSession":
+        """
+        Create the session that order requests are sent over.
+        
+        It has its own connection pool, so orders never queue behind market data requests, \
+and keeps its connections alive between orders. The order bodies are already JSON, \
+so the content type is set once for the whole session.
+        """
+        
+        import aiohttp
+        
+        self.__order_session = aiohttp.ClientSession(
+            base_url=Client.REST_API_BASE_URL,
+            headers={
+                "Authorization": f"Token {self.__api_token}",
+                "content-type": "application/json"},
+            connector=aiohttp.TCPConnector(
+                limit=self.__order_connections,
+                keepalive_timeout=300),
+            trace_configs=self.__trace_configs)
+        return self.__order_session
+    
+    async def __order_post(
+        self,
+        url: str,
+        body: bytes
+        ) -> dict:
+        """
+        The coroutine for sending a pre-serialized body over the order session.
+        
+        Args:
+            url: The URL of the API endpoint to call.
+            body: The JSON request body.
+            
+        Returns:
+            A `dict` containing the response.
+        """
+        
+        if not self.has_token:
+            raise Exception("The client does not have a token! \
+Initialize the client using your API token as such: \
+`client = Client('yourTOKENhereHEX0000000000')`")
+        session = self.__order_session or self.__open_order_session()
+        async with session.post(url, data=body) as response:
+            return await response.json()
+        
+    async def warm_up_orders(self) -> None:
+        """
+        Open the order connections ahead of time, so the first orders don't pay \
+for the TCP and TLS handshakes. Each connection sends a small market stats request, \
+whose response has a body, so the connection goes back to the pool afterwards.
+        
+        Rate limit: N/A
+        Token: Required
+
+        Args:
+            None
+
+        Returns:
+            None
+            
+        Raises:
+            Exception: If the client does not have a token.
+            aiohttp.ClientError: If a warm-up request fails.
+        """
+        
+        if not self.has_token:
+            raise Exception("The client does not have a token! \
+Initialize the client using your API token as such: \
+`client = Client('yourTOKENhereHEX0000000000')`")
+        import asyncio
+        
+        session = self.__order_session or self.__open_order_session()
+        
+        async def touch():
+            async with session.get(
+                Path.GET_MARKET_STATS.value,
+                params={"srcCurrency": "usdt", "dstCurrency": "rls"}) as response:
+                response.raise_for_status()
+                await response.read()
+        
+        await asyncio.gather(*(touch() for _ in range(self.__order_connections)))
+    
+    async def place_order(
+        self,
+        symbol: Symbol,
+        side: OrderType,
+        amount,
+        price = None,
+        execution: Execution = Execution.LIMIT,
+        client_order_id: str = None
+        ) -> dict:
+        """
+        Place a spot order.
+        
+        Rate limit: 300/10min
+        Token: Required
+
+        Args:
+            symbol: The market to place the order in. Can't be `Symbol.ALL`.
+            side: `OrderType.BUY` or `OrderType.SELL`.
+            amount: The order amount in the source currency.
+            price: The order price. Required for limit orders.
+            execution: `Execution.LIMIT` or `Execution.MARKET`. Defaults to `Execution.LIMIT`.
+            client_order_id: An optional ID to refer to the order with.
+
+        Returns:
+            `dict` containing the placed order and the request status.
+            
+        Raises:
+            ValueError: If a limit order has no price, or the order doesn't match \
+the precision of the market when the client has a `markets` registry.
+        """
+        
+        from .orders import order_template
+        
+        if execution == Execution.LIMIT and price is None:
+            raise ValueError("Limit orders need a price.")
+        if self.markets is not None:
+            amount, price = self.markets.validate_order(symbol, amount, price)
+        body = order_template(symbol, side, execution).render(amount, price, client_order_id)
+        return await self.__order_post(Path.PLACE_ORDER.value, body)
+    
+    async def get_order_status(
+        self,
+        order_id: int = None,
+        client_order_id: str = None
+        ) -> dict:
+        """
+        Get the status of an order.
+        
+        Rate limit: 60/min
+        Token: Required
+
+        Args:
+            order_id: The ID of the order.
+            client_order_id: The client order ID. Used if `order_id` is not passed.
+
+        Returns:
+            `dict` containing the order and the request status.
+            
+        Raises:
+            ValueError: If neither of the IDs is passed.
+        """
+        
+        if order_id is not None:
+            body = f'{{"id":{int(order_id)}}}'
+        elif client_order_id is not None:
+            body = f'{{"clientOrderId":{json.dumps(client_order_id)}}}'
+        else:
+            raise ValueError("Either `order_id` or `client_order_id` is needed.")
+        return await self.__order_post(Path.GET_ORDER_STATUS.value, body.encode())
+    
+    async def cancel_order(
+        self,
+        order_id: int = None,
+        client_order_id: str = None
+        ) -> dict:
+        """
+        Cancel an order.
+        
+        Rate limit: 90/min
+        Token: Required
+
+        Args:
+            order_id: The ID of the order.
+            client_order_id: The client order ID. Used if `order_id` is not passed.
+
+        Returns:
+            `dict` containing the new order status and the request status.
+            
+        Raises:
+            ValueError: If neither of the IDs is passed.
+        """
+        
+        if order_id is not None:
+            body = f'{{"order":{int(order_id)},"status":"canceled"}}'
+        elif client_order_id is not None:
+            body = f'{{"clientOrderId":{json.dumps(client_order_id)},"status":"canceled"}}'
+        else:
+            raise ValueError("Either `order_id` or `client_order_id` is needed.")
+        return await self.__order_post(Path.UPDATE_ORDER_STATUS.value, body.encode())
+    
+    async def cancel_orders(
+        self,
+        *order_ids: int
+        ) -> list:
+        """
+        Cancel several orders at once.
+        The cancellations are sent concurrently over the order connections.
+        
+        Rate limit: 90/min
+        Token: Required
+
+        Args:
+            order_ids: The IDs of the orders.
+
+        Returns:
+            A `list` with the response `dict` of each order, in the order of `order_ids`.
+            A failed cancellation is returned as its exception instead of being raised.
+            
+        Raises:
+            None
+        """
+        
+        import asyncio
+        
+        return await asyncio.gather(
+            *(self.cancel_order(i) for i in order_ids),
+            return_exceptions=True)
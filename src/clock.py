@@ -0,0 +1,178 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# The resolution of the HTTP `Date` header in seconds
+DATE_RESOLUTION = 1.0
+
+_MONTHS = {
+    month: i for i, month in enumerate(
+        ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+
+class StaleDataError(Exception):
+    """
+    Raised when market data is older than the allowed maximum age.
+    """
+
+    def __init__(self, age: float, max_age: float) -> None:
+        super().__init__(f"The market data is {age:.3f}s old, more than the allowed {max_age:.3f}s.")
+        self.age = age
+        self.max_age = max_age
+
+
+def parse_http_date(value: str) -> float | None:
+    """
+    Parse an HTTP `Date` header such as `'Sun, 06 Nov 1994 08:49:37 GMT'`.
+
+    Args:
+        value: The header value.
+
+    Returns:
+        The unix time, or `None` if the header is missing or malformed.
+
+    Raises:
+        None
+    """
+
+    try:
+        _, day, month, year, clock, _ = value.split()
+        hour, minute, second = clock.split(":")
+        return datetime(
+            int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second),
+            tzinfo=timezone.utc).timestamp()
+    except (AttributeError, ValueError, KeyError):
+        return None
+
+
+class ClockEstimator:
+    """
+    Keeps a running estimate of the server clock offset and the request round-trip time.
+
+    Every response bounds the offset (server time minus local time): the `Date` header says the
+    server clock was within `[date, date + 1s)` at some point between sending the request and
+    receiving the response, and a timestamp in the body can't be later than the server clock at
+    the time the response arrived. The estimate is the middle of the intersection of these bounds
+    over the last `window` responses. A single response whose bounds don't overlap the others
+    (e.g. a stale cached response) is ignored. If two in a row don't (e.g. after the local clock
+    was adjusted), only the bounds from the latest response are kept.
+    """
+
+    def __init__(
+        self,
+        window: int = 32,
+        rtt_weight: float = 0.125
+        ) -> None:
+        """
+        Sets up an estimator without samples. Until the first sample the offset is `0`.
+
+        Args:
+            window: The number of recent bounds to intersect. Defaults to `32`.
+            rtt_weight: The weight of the newest sample in the RTT moving average. Defaults to `0.125`.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        self.rtt_weight = rtt_weight
+        self.rtt = None
+        self.__bounds = deque(maxlen=window)
+        self.__low = -float("inf")
+        self.__high = float("inf")
+        self.__outliers = 0
+
+    def __add(self, low: float, high: float) -> None:
+        if low > self.__high or high < self.__low:
+            self.__outliers += 1
+            if self.__outliers < 2:
+                return
+            self.__bounds.clear()
+        self.__outliers = 0
+        self.__bounds.append((low, high))
+        self.__low = max(i[0] for i in self.__bounds)
+        self.__high = min(i[1] for i in self.__bounds)
+
+    def observe(
+        self,
+        sent: float,
+        received: float,
+        server_date: float = None
+        ) -> None:
+        """
+        Add a request to the estimate.
+
+        Args:
+            sent: The local unix time the request was sent at.
+            received: The local unix time the response headers arrived at.
+            server_date: The unix time from the `Date` header, if there was one.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        rtt = received - sent
+        self.rtt = rtt if self.rtt is None else self.rtt + self.rtt_weight * (rtt - self.rtt)
+        if server_date is not None:
+            self.__add(server_date - received, server_date + 1 - sent)
+
+    def observe_timestamp(
+        self,
+        received: float,
+        server_timestamp: float
+        ) -> None:
+        """
+        Add a server timestamp from a response body to the estimate.
+
+        Args:
+            received: The local unix time the response arrived at.
+            server_timestamp: The unix time the server stamped the data with.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        self.__add(server_timestamp - received, float("inf"))
+
+    @property
+    def offset(self) -> float:
+        """
+        The estimated server time minus the local time, in seconds.
+        """
+
+        if not self.__bounds:
+            return 0.0
+        if self.__high == float("inf"):
+            return max(self.__low, 0.0)
+        return (self.__low + self.__high) / 2
+
+    def server_time(self) -> float:
+        """
+        The estimated current server time as unix time.
+        """
+
+        return time.time() + self.offset
+
+    def age(self, server_timestamp: float) -> float:
+        """
+        Estimate how old data stamped by the server is.
+
+        Args:
+            server_timestamp: The unix time the server stamped the data with.
+
+        Returns:
+            The age in seconds. Never negative.
+
+        Raises:
+            None
+        """
+
+        return max(0.0, self.server_time() - server_timestamp)
@@ -0,0 +1,428 @@
+"""
+Export OHLCV history and trade snapshots to partitioned Parquet or Arrow IPC files.
+
+Usage:
+    python -m src.export OUT_DIR --start 2023-01-01 --resolution 60 D --symbol BTCIRT ETHIRT
+
+Every `(symbol, resolution)` pair is a partition under `OUT_DIR/ohlcv/symbol=<symbol>/resolution=<resolution>/`.
+Candles are fetched window by window and streamed to the current part file. A part file is
+only renamed to its final name after it is closed, and the partition checkpoint is moved past
+it at the same time, so running the same command again continues where an interrupted export stopped.
+Parts are closed after `--rows-per-file` rows or `--commit-interval` seconds, whichever comes
+first, so an interruption loses at most about `--commit-interval` seconds of fetching.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from .client import Client
+from .utils import Symbol, Resolution
+
+RESOLUTION_SECONDS = {
+    Resolution._1MIN: 60,
+    Resolution._5MIN: 5 * 60,
+    Resolution._15MIN: 15 * 60,
+    Resolution._30MIN: 30 * 60,
+    Resolution._1HOUR: 60 * 60,
+    Resolution._3HOUR: 3 * 60 * 60,
+    Resolution._4HOUR: 4 * 60 * 60,
+    Resolution._6HOUR: 6 * 60 * 60,
+    Resolution._12HOUR: 12 * 60 * 60,
+    Resolution._1DAY: 24 * 60 * 60,
+    Resolution._2DAY: 2 * 24 * 60 * 60,
+    Resolution._3DAY: 3 * 24 * 60 * 60,
+}
+
+CHECKPOINT_FILE = "_checkpoint.json"
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The exporter needs `pyarrow`. Install it with `pip install pyarrow`.") from None
+    return pyarrow
+
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most `rate` of them start per minute.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 60 / rate
+        self.__next = 0.0
+        self.__lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.__lock:
+            now = time.monotonic()
+            if self.__next > now:
+                await asyncio.sleep(self.__next - now)
+                now = self.__next
+            self.__next = now + self.interval
+
+
+class Partition:
+    """
+    One output directory, its rolling part files and its checkpoint.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        schema,
+        file_format: str = "parquet",
+        rows_per_file: int = 500_000,
+        commit_interval: float = 60
+        ) -> None:
+        self.directory = directory
+        self.schema = schema
+        self.file_format = file_format
+        self.rows_per_file = rows_per_file
+        self.commit_interval = commit_interval
+        self.__writer = None
+        self.__sink = None
+        self.__rows = 0
+        self.__pending = {}
+        self.__committed = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        # Part files that were still open when a previous run was interrupted
+        for path in glob.glob(os.path.join(directory, "*.tmp")):
+            os.remove(path)
+        self.checkpoint = self.__load_checkpoint()
+
+    def __load_checkpoint(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {"parts": 0}
+
+    def __save_checkpoint(self) -> None:
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self.checkpoint, file)
+        os.replace(f"{path}.tmp", path)
+
+    def __part_path(self) -> str:
+        return os.path.join(
+            self.directory,
+            f"part-{self.checkpoint['parts']:05d}.{EXTENSIONS[self.file_format]}")
+
+    def __open(self) -> None:
+        pa = _pyarrow()
+        path = f"{self.__part_path()}.tmp"
+        if self.file_format == "parquet":
+            self.__writer = pa.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.__sink = pa.OSFile(path, "wb")
+            self.__writer = pa.ipc.new_file(self.__sink, self.schema)
+        self.__rows = 0
+
+    def write(self, columns: dict) -> None:
+        """
+        Append a batch to the current part file.
+
+        Args:
+            columns: The batch as a `dict` of column name to values.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        pa = _pyarrow()
+        if self.__writer is None:
+            self.__open()
+        batch = pa.record_batch(
+            [pa.array(columns[field.name], field.type) for field in self.schema],
+            schema=self.schema)
+        if self.file_format == "parquet":
+            self.__writer.write_batch(batch)
+        else:
+            self.__writer.write(batch)
+        self.__rows += batch.num_rows
+
+    def advance(self, **progress) -> None:
+        """
+        Record how far the export got, committing the part file once it has `rows_per_file`
+        rows or `commit_interval` seconds have passed since the last commit.
+
+        Args:
+            progress: The checkpoint fields that hold once everything written so far is committed.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        self.__pending.update(progress)
+        if (self.__rows >= self.rows_per_file
+                or time.monotonic() - self.__committed >= self.commit_interval):
+            self.commit()
+
+    def commit(self, **progress) -> None:
+        """
+        Close the current part file, give it its final name and move the checkpoint past it.
+
+        Args:
+            progress: Checkpoint fields to store even if no part file is open.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        if self.__writer is not None:
+            self.__writer.close()
+            if self.__sink is not None:
+                self.__sink.close()
+            path = self.__part_path()
+            os.replace(f"{path}.tmp", path)
+            self.__writer = self.__sink = None
+            self.__rows = 0
+            self.checkpoint["parts"] += 1
+        self.checkpoint.update(self.__pending)
+        self.checkpoint.update(progress)
+        self.__pending = {}
+        self.__committed = time.monotonic()
+        self.__save_checkpoint()
+
+
+def ohlcv_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("time", pa.int64()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64())])
+
+
+def trades_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("time", pa.int64()),
+        ("price", pa.float64()),
+        ("volume", pa.float64()),
+        ("type", pa.string())])
+
+
+async def export_ohlcv(
+    client: Client,
+    limiter: RateLimiter,
+    out_dir: str,
+    symbol: Symbol,
+    resolution: Resolution,
+    start: int,
+    end: int,
+    file_format: str = "parquet",
+    candles_per_request: int = 500,
+    rows_per_file: int = 500_000,
+    commit_interval: float = 60
+    ) -> int:
+    """
+    Export the candles of one symbol and resolution between `start` and `end`.
+
+    Args:
+        client: The `Client` to fetch the candles with.
+        limiter: The `RateLimiter` shared by all the exports.
+        out_dir: The root output directory.
+        symbol: The symbol to export.
+        resolution: The candle timeframe.
+        start: Beginning time (in unix time).
+        end: End time (in unix time), exclusive.
+        file_format: `'parquet'` or `'arrow'`.
+        candles_per_request: The number of candles fetched per request.
+        rows_per_file: The number of rows after which a part file is committed.
+        commit_interval: The number of seconds after which a part file is committed.
+
+    Returns:
+        The number of candles written by this run.
+
+    Raises:
+        ValueError: If the server returns an error.
+    """
+
+    step = RESOLUTION_SECONDS[resolution]
+    partition = Partition(
+        os.path.join(out_dir, "ohlcv", f"symbol={symbol.value}", f"resolution={resolution.value}"),
+        ohlcv_schema(),
+        file_format,
+        rows_per_file,
+        commit_interval)
+    cursor = max(partition.checkpoint.get("next", 0), start - start % step)
+    written = 0
+    while cursor < end:
+        to = min(cursor + step * candles_per_request, end)
+        await limiter.wait()
+        response = await client.ohlcv(
+            symbol, resolution, cursor, to - 1, countback=-(-(to - cursor) // step))
+        if response.get("s") == "ok":
+            times = response["t"]
+            keep = [i for i, t in enumerate(times) if cursor <= t < to]
+            if keep:
+                partition.write(
+                    {"time": [times[i] for i in keep],
+                     "open": [float(response["o"][i]) for i in keep],
+                     "high": [float(response["h"][i]) for i in keep],
+                     "low": [float(response["l"][i]) for i in keep],
+                     "close": [float(response["c"][i]) for i in keep],
+                     "volume": [float(response["v"][i]) for i in keep]})
+                written += len(keep)
+        elif response.get("s") != "no_data":
+            raise ValueError(f"Can't fetch the {symbol.value} candles: {response}")
+        cursor = to
+        partition.advance(next=cursor)
+    partition.commit(next=cursor)
+    return written
+
+
+async def export_trades(
+    client: Client,
+    limiter: RateLimiter,
+    out_dir: str,
+    symbol: Symbol,
+    file_format: str = "parquet"
+    ) -> int:
+    """
+    Append the trades of one symbol that are newer than the last exported snapshot.
+
+    Args:
+        client: The `Client` to fetch the trades with.
+        limiter: The `RateLimiter` for the trades endpoint.
+        out_dir: The root output directory.
+        symbol: The symbol to export.
+        file_format: `'parquet'` or `'arrow'`.
+
+    Returns:
+        The number of trades written by this run.
+
+    Raises:
+        None
+    """
+
+    partition = Partition(
+        os.path.join(out_dir, "trades", f"symbol={symbol.value}"),
+        trades_schema(),
+        file_format)
+    await limiter.wait()
+    last = partition.checkpoint.get("last_time", 0)
+    trades = sorted((i for i in (await client.get_trades(symbol)).trades if i.time > last),
+                    key=lambda i: i.time)
+    if trades:
+        partition.write(
+            {"time": [i.time for i in trades],
+             "price": [i.price for i in trades],
+             "volume": [i.volume for i in trades],
+             "type": [i.type for i in trades]})
+        partition.advance(last_time=trades[-1].time)
+    partition.commit()
+    return len(trades)
+
+
+def _timestamp(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.export",
+        description="Export OHLCV history and trade snapshots to Parquet or Arrow IPC files.")
+    parser.add_argument("out_dir", help="The root output directory.")
+    parser.add_argument(
+        "--symbol", nargs="+", default=[i.value for i in Symbol if i != Symbol.ALL],
+        choices=[i.value for i in Symbol if i != Symbol.ALL], metavar="SYMBOL",
+        help="The symbols to export. Defaults to every symbol.")
+    parser.add_argument(
+        "--resolution", nargs="+", default=[Resolution._1DAY.value],
+        choices=[i.value for i in Resolution], metavar="RESOLUTION",
+        help="The candle timeframes to export, e.g. `60 D`. Defaults to `D`.")
+    parser.add_argument(
+        "--start", type=_timestamp, required=True,
+        help="Beginning time as unix time or an ISO date (UTC).")
+    parser.add_argument(
+        "--end", type=_timestamp, default=None,
+        help="End time as unix time or an ISO date (UTC). Defaults to now.")
+    parser.add_argument("--format", choices=list(EXTENSIONS), default="parquet")
+    parser.add_argument(
+        "--trades", action="store_true",
+        help="Also append a snapshot of the latest trades of every symbol.")
+    parser.add_argument(
+        "--concurrency", type=int, default=8,
+        help="The number of partitions exported at the same time.")
+    parser.add_argument(
+        "--rate", type=float, default=60,
+        help="The maximum number of OHLCV requests per minute.")
+    parser.add_argument(
+        "--trades-rate", type=float, default=15,
+        help="The maximum number of trades requests per minute.")
+    parser.add_argument("--candles-per-request", type=int, default=500)
+    parser.add_argument("--rows-per-file", type=int, default=500_000)
+    parser.add_argument(
+        "--commit-interval", type=float, default=60,
+        help="The maximum number of seconds between two commits of a partition.")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list = None) -> None:
+    """
+    Run the exporter with the command line arguments.
+    """
+
+    args = _parse_args(argv)
+    _pyarrow()
+    end = args.end if args.end is not None else int(time.time())
+    symbols = [Symbol(i) for i in args.symbol]
+    resolutions = [Resolution(i) for i in args.resolution]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limiter = RateLimiter(args.rate)
+    trades_limiter = RateLimiter(args.trades_rate)
+    client = Client()
+
+    async def run(label: str, job) -> None:
+        async with semaphore:
+            count = await job
+            print(f"{label}: {count} rows")
+
+    try:
+        jobs = [
+            run(f"{symbol.value} {resolution.value}",
+                export_ohlcv(
+                    client, limiter, args.out_dir, symbol, resolution, args.start, end,
+                    args.format, args.candles_per_request, args.rows_per_file,
+                    args.commit_interval))
+            for symbol in symbols for resolution in resolutions]
+        if args.trades:
+            jobs.extend(
+                run(f"{symbol.value} trades",
+                    export_trades(client, trades_limiter, args.out_dir, symbol, args.format))
+                for symbol in symbols)
+        await asyncio.gather(*jobs)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,409 @@
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation, ROUND_DOWN, ROUND_HALF_EVEN
+
+from .utils import Symbol, Currency
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "nobitex", "markets.json")
+DEFAULT_TTL = 24 * 60 * 60
+
+# Market suffix -> the currency code the API uses for it
+QUOTE_CURRENCIES = {"IRT": "rls", "USDT": "usdt"}
+
+_SYMBOLS = {i.value: i for i in Symbol}
+_CURRENCIES = {i.value: i for i in Currency}
+
+
+def split_symbol(symbol: str) -> tuple[str, str]:
+    """
+    Split a market symbol into its source and destination currencies.
+
+    Args:
+        symbol: The market symbol, e.g. `'BTCIRT'`.
+
+    Returns:
+        The `(source, destination)` currency codes, e.g. `('btc', 'rls')`.
+
+    Raises:
+        ValueError: If the symbol does not end with a known quote currency.
+    """
+
+    for suffix, destination in QUOTE_CURRENCIES.items():
+        if symbol.endswith(suffix) and len(symbol) > len(suffix):
+            return symbol[:-len(suffix)].lower(), destination
+    raise ValueError(f"Can't find the quote currency of the symbol `{symbol}`.")
+
+
+class ListedCurrency:
+    """
+    A currency listed by the exchange that has no member in `utils.Currency`.
+    Like the enum members it exposes the API code as `value`.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"ListedCurrency({self.value!r})"
+
+    def __eq__(self, other) -> bool:
+        return self.value == getattr(other, "value", other)
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+class Market:
+    """
+    The metadata of a single market.
+    Exposes the symbol as `value`, so it can be passed to the `Client` methods in place of a `Symbol`.
+    """
+
+    __slots__ = ("symbol", "source", "destination", "amount_step", "price_step")
+
+    def __init__(
+        self,
+        symbol: str,
+        amount_step: Decimal,
+        price_step: Decimal
+        ) -> None:
+        self.symbol = symbol
+        self.source, self.destination = split_symbol(symbol)
+        self.amount_step = amount_step
+        self.price_step = price_step
+
+    def __repr__(self) -> str:
+        return f"Market({self.symbol!r}, amount_step={self.amount_step}, price_step={self.price_step})"
+
+    @property
+    def value(self) -> str:
+        return self.symbol
+
+
+def _quantize(value, step: Decimal, rounding: str) -> Decimal:
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"`{value}` is not a number.") from None
+    if not value.is_finite():
+        raise ValueError(f"`{value}` is not a finite number.")
+    if not step:
+        return value
+    return (value / step).to_integral_value(rounding=rounding) * step
+
+
+class MarketRegistry:
+    """
+    The markets, currencies and precisions listed by the exchange.
+
+    The registry is built from the `/v2/options` response and cached on disk, so it
+    is downloaded at most once per `ttl`. Every lookup is a single `dict` access.
+    """
+
+    def __init__(
+        self,
+        options: dict,
+        fetched_at: float = None
+        ) -> None:
+        """
+        Builds the registry from an `/v2/options` response.
+
+        Args:
+            options: The `dict` returned by `Client.get_options`.
+            fetched_at: The unix time the options were downloaded at. Defaults to now.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        self.options = options
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        nobitex = options.get("nobitex", {})
+        amount_precisions = nobitex.get("amountPrecisions", {})
+        price_precisions = nobitex.get("pricePrecisions", {})
+        self.__markets = {}
+        for symbol in set(amount_precisions) | set(price_precisions):
+            try:
+                self.__markets[symbol] = Market(
+                    symbol,
+                    Decimal(str(amount_precisions.get(symbol, 0))),
+                    Decimal(str(price_precisions.get(symbol, 0))))
+            except ValueError:
+                continue
+        currencies = set(nobitex.get("allCurrencies", ()))
+        for market in self.__markets.values():
+            currencies.update((market.source, market.destination))
+        self.__currencies = {
+            i: _CURRENCIES.get(i) or ListedCurrency(i) for i in currencies}
+
+    def __contains__(self, symbol) -> bool:
+        return getattr(symbol, "value", symbol) in self.__markets
+
+    def __iter__(self):
+        return iter(self.__markets.values())
+
+    def __len__(self) -> int:
+        return len(self.__markets)
+
+    # Loading
+
+    @classmethod
+    async def load(
+        cls,
+        client,
+        cache_path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL,
+        refresh: bool = False
+        ) -> "MarketRegistry":
+        """
+        Get the registry from the disk cache, or download and cache it if the cache is missing or expired.
+
+        Args:
+            client: The `Client` to download the options with.
+            cache_path: The file to cache the options in. Pass `None` to disable the cache.
+            ttl: The number of seconds a cached copy stays valid. Defaults to a day.
+            refresh: Whether to ignore the cached copy. Defaults to `False`.
+
+        Returns:
+            The `MarketRegistry`.
+
+        Raises:
+            ValueError: If the server doesn't return the options.
+        """
+
+        if cache_path and not refresh:
+            registry = cls.from_cache(cache_path, ttl)
+            if registry is not None:
+                return registry
+        options = await client.get_options()
+        if options.get("status") != "ok":
+            raise ValueError(f"Can't load the market options: {options}")
+        registry = cls(options)
+        if cache_path:
+            registry.save(cache_path)
+        return registry
+
+    @classmethod
+    def from_cache(
+        cls,
+        cache_path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL
+        ) -> "MarketRegistry | None":
+        """
+        Get the registry from the disk cache.
+
+        Args:
+            cache_path: The cache file written by `save`.
+            ttl: The number of seconds a cached copy stays valid.
+
+        Returns:
+            The `MarketRegistry`, or `None` if the cache is missing, unreadable or expired.
+
+        Raises:
+            None
+        """
+
+        try:
+            with open(cache_path, encoding="utf-8") as file:
+                cached = json.load(file)
+            fetched_at = float(cached["fetched_at"])
+            options = cached["options"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if time.time() - fetched_at > ttl:
+            return None
+        return cls(options, fetched_at)
+
+    def save(self, cache_path: str = DEFAULT_CACHE_PATH) -> None:
+        """
+        Write the registry to the disk cache.
+
+        Args:
+            cache_path: The file to write to. Its directory is created if needed.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"fetched_at": self.fetched_at, "options": self.options}, file)
+        os.replace(temp_path, cache_path)
+
+    # Lookups
+
+    def market(self, symbol) -> Market:
+        """
+        Get the metadata of a market.
+
+        Args:
+            symbol: A `Symbol`, a `Market` or the symbol string, e.g. `'BTCIRT'`.
+
+        Returns:
+            The `Market`.
+
+        Raises:
+            ValueError: If the exchange doesn't list the market.
+        """
+
+        try:
+            return self.__markets[getattr(symbol, "value", symbol)]
+        except KeyError:
+            raise ValueError(f"The market `{getattr(symbol, 'value', symbol)}` is not listed.") from None
+
+    def symbol(self, name: str) -> "Symbol | Market":
+        """
+        Get the object to pass to the `Client` methods for a symbol string.
+
+        Args:
+            name: The symbol string, e.g. `'BTCIRT'`.
+
+        Returns:
+            The `Symbol` member if there is one, otherwise the `Market`.
+
+        Raises:
+            ValueError: If the exchange doesn't list the market.
+        """
+
+        market = self.market(name)
+        return _SYMBOLS.get(market.symbol, market)
+
+    def currency(self, name: str) -> "Currency | ListedCurrency":
+        """
+        Get the object to pass to the `Client` methods for a currency code.
+
+        Args:
+            name: The currency code, e.g. `'btc'`.
+
+        Returns:
+            The `Currency` member if there is one, otherwise a `ListedCurrency`.
+
+        Raises:
+            ValueError: If the exchange doesn't list the currency.
+        """
+
+        try:
+            return self.__currencies[getattr(name, "value", name)]
+        except KeyError:
+            raise ValueError(f"The currency `{getattr(name, 'value', name)}` is not listed.") from None
+
+    def precision(self, symbol) -> tuple[Decimal, Decimal]:
+        """
+        Get the amount and price steps of a market.
+
+        Args:
+            symbol: A `Symbol`, a `Market` or the symbol string.
+
+        Returns:
+            The `(amount_step, price_step)` of the market.
+
+        Raises:
+            ValueError: If the exchange doesn't list the market.
+        """
+
+        market = self.market(symbol)
+        return market.amount_step, market.price_step
+
+    # Validation
+
+    def round_amount(
+        self,
+        symbol,
+        amount,
+        rounding: str = ROUND_DOWN
+        ) -> Decimal:
+        """
+        Round an order amount to the amount step of a market.
+        Rounds down by default so the order never exceeds the intended amount.
+
+        Args:
+            symbol: A `Symbol`, a `Market` or the symbol string.
+            amount: The amount as a number or a numeric string.
+            rounding: A `decimal` rounding mode. Defaults to `ROUND_DOWN`.
+
+        Returns:
+            The rounded amount as a `Decimal`.
+
+        Raises:
+            ValueError: If the market isn't listed or the amount isn't a number.
+        """
+
+        return _quantize(amount, self.market(symbol).amount_step, rounding)
+
+    def round_price(
+        self,
+        symbol,
+        price,
+        rounding: str = ROUND_HALF_EVEN
+        ) -> Decimal:
+        """
+        Round an order price to the price step (tick size) of a market.
+
+        Args:
+            symbol: A `Symbol`, a `Market` or the symbol string.
+            price: The price as a number or a numeric string.
+            rounding: A `decimal` rounding mode. Defaults to `ROUND_HALF_EVEN`.
+
+        Returns:
+            The rounded price as a `Decimal`.
+
+        Raises:
+            ValueError: If the market isn't listed or the price isn't a number.
+        """
+
+        return _quantize(price, self.market(symbol).price_step, rounding)
+
+    def validate_order(
+        self,
+        symbol,
+        amount,
+        price=None,
+        adjust: bool = False
+        ) -> tuple[Decimal, Decimal | None]:
+        """
+        Check an order against the market metadata before it is sent.
+
+        Args:
+            symbol: A `Symbol`, a `Market` or the symbol string.
+            amount: The order amount.
+            price: The order price. Pass `None` for market orders.
+            adjust: Whether to round the amount and price to the market steps \
+instead of rejecting them. Defaults to `False`.
+
+        Returns:
+            The `(amount, price)` as `Decimal`s, ready to be sent.
+
+        Raises:
+            ValueError: If the market isn't listed, or the amount or price is \
+not positive or not a multiple of the market step.
+        """
+
+        if symbol == Symbol.ALL:
+            raise ValueError("Can't place an order on `Symbol.ALL`.")
+        market = self.market(symbol)
+        checks = [("amount", amount, market.amount_step, ROUND_DOWN)]
+        if price is not None:
+            checks.append(("price", price, market.price_step, ROUND_HALF_EVEN))
+        result = []
+        for name, value, step, rounding in checks:
+            value = _quantize(value, 0, rounding)
+            rounded = _quantize(value, step, rounding)
+            if not adjust and rounded != value:
+                raise ValueError(
+                    f"The {name} `{value}` is not a multiple of {step} in the {market.symbol} market.")
+            if rounded <= 0:
+                raise ValueError(f"The {name} must be positive, got `{value}`.")
+            result.append(rounded)
+        return result[0], (result[1] if price is not None else None)
@@ -0,0 +1,447 @@
+import time
+from collections.abc import Mapping
+from typing import NamedTuple
+
+
+class PriceLevel(NamedTuple):
+    """
+    A single price level of an order book side.
+    """
+
+    price: float
+    amount: float
+
+
+class Trade(NamedTuple):
+    """
+    A single public trade.
+    """
+
+    time: int
+    price: float
+    volume: float
+    type: str
+
+
+class Balance(NamedTuple):
+    """
+    A single wallet entry from the `/v2/wallets` endpoint.
+    """
+
+    id: int
+    balance: float
+    blocked: float
+
+
+class Wallet(NamedTuple):
+    """
+    A single wallet entry from the `/users/wallets/list` endpoint.
+    """
+
+    id: int
+    currency: str
+    balance: float
+    blocked_balance: float
+    active_balance: float
+    rial_balance: float
+    deposit_address: str
+
+
+class Transaction(NamedTuple):
+    """
+    A single wallet transaction.
+    """
+
+    id: int
+    currency: str
+    amount: float
+    description: str
+    created_at: str
+    calculated_fee: float
+
+
+class MarketStat(NamedTuple):
+    """
+    The stats of a single market as returned by `/market/stats`.
+    """
+
+    is_closed: bool
+    best_sell: float
+    best_buy: float
+    volume_src: float
+    volume_dst: float
+    latest: float
+    mark: float
+    day_low: float
+    day_high: float
+    day_open: float
+    day_close: float
+    day_change: float
+
+
+def _float(value) -> float:
+    """
+    Convert the numeric strings the API returns to `float`, treating missing values as `0.0`.
+    """
+
+    if value is None or value == "":
+        return 0.0
+    return float(value)
+
+
+def _elapsed(stamp: tuple | None) -> float | None:
+    """
+    The current age of a `(age, monotonic time)` stamp, or `None` if there is no stamp.
+    """
+
+    if stamp is None:
+        return None
+    age, received = stamp
+    return age + time.monotonic() - received
+
+
+def _levels(rows: list) -> tuple[PriceLevel, ...]:
+    return tuple(PriceLevel(float(price), float(amount)) for price, amount in rows)
+
+
+class Model(Mapping):
+    """
+    The base class of the response models.
+
+    A model is a read-only mapping over the fully decoded JSON response, so code written
+    against the raw `dict` responses (`model["status"]`, `model.keys()`, `dict(model)`,
+    iterating over the keys) keeps working. The typed representation of a nested section
+    is only available through its named property (`.asks`, `.trades`, `.wallets`, ...),
+    which builds it the first time it is read and caches it for later reads.
+    """
+
+    __slots__ = ("_raw", "_stamp")
+
+    def __init__(self, raw: dict) -> None:
+        self._raw = raw
+        self._stamp = None
+
+    def __getitem__(self, key: str):
+        return self._raw[key]
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._raw
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._raw!r})"
+
+    def get(self, key: str, default=None):
+        return self._raw.get(key, default)
+
+    @property
+    def status(self) -> str:
+        return self._raw.get("status")
+
+    @property
+    def age(self) -> float | None:
+        """
+        The estimated age of the data in seconds, or `None` if the response was not stamped.
+        """
+
+        return _elapsed(self._stamp)
+
+    def stamp(self, age: float) -> None:
+        """
+        Record the age of the data when the response was received.
+        `age` keeps growing from this value as time passes.
+        """
+
+        self._stamp = (age, time.monotonic())
+
+    def to_dict(self) -> dict:
+        """
+        Get the response exactly as the server returned it.
+
+        Args:
+            None
+
+        Returns:
+            The decoded JSON response as a `dict`, e.g. for `json.dumps`.
+            The returned object is shared with the model and should not be mutated.
+
+        Raises:
+            None
+        """
+
+        return self._raw
+
+
+class OrderBook(Model):
+    """
+    The order book (or market depth) of a single symbol.
+    """
+
+    __slots__ = ("_asks", "_bids")
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._asks = None
+        self._bids = None
+
+    @property
+    def last_update(self) -> int:
+        return self._raw.get("lastUpdate")
+
+    @property
+    def last_trade_price(self) -> float:
+        return _float(self._raw.get("lastTradePrice"))
+
+    @property
+    def asks(self) -> tuple[PriceLevel, ...]:
+        if self._asks is None:
+            self._asks = _levels(self._raw.get("asks", ()))
+        return self._asks
+
+    @property
+    def bids(self) -> tuple[PriceLevel, ...]:
+        if self._bids is None:
+            self._bids = _levels(self._raw.get("bids", ()))
+        return self._bids
+
+
+class OrderBooks(Model):
+    """
+    The order books of all symbols, as returned for `Symbol.ALL`.
+    Each book is only wrapped when it is looked up.
+    """
+
+    __slots__ = ("_books",)
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._books = {}
+
+    def book(self, symbol) -> OrderBook:
+        """
+        Get the order book of a single symbol.
+
+        Args:
+            symbol: The `Symbol` (or its value) to get the book for.
+
+        Returns:
+            The `OrderBook` of the symbol.
+
+        Raises:
+            KeyError: If the symbol is not in the response.
+        """
+
+        symbol = getattr(symbol, "value", symbol)
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = OrderBook(self._raw[symbol])
+        return book
+
+    @property
+    def symbols(self) -> tuple[str, ...]:
+        return tuple(key for key, value in self._raw.items() if isinstance(value, dict))
+
+
+class Trades(Model):
+    """
+    The latest public trades of a single symbol.
+    """
+
+    __slots__ = ("_trades", "_trade_stamp")
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._trades = None
+        self._trade_stamp = None
+
+    @property
+    def last_update(self) -> int:
+        return self._raw.get("lastUpdate")
+
+    @property
+    def last_trade_time(self) -> int | None:
+        """
+        The time of the newest trade in milliseconds, or `None` if there are no trades.
+        """
+
+        return max((i["time"] for i in self._raw.get("trades", ())), default=None)
+
+    @property
+    def last_trade_age(self) -> float | None:
+        """
+        The estimated time since the newest trade in seconds, or `None` if it was not stamped.
+        On a quiet market this grows while `age` (the age of the response) stays small.
+        """
+
+        return _elapsed(self._trade_stamp)
+
+    def stamp_last_trade(self, age: float) -> None:
+        """
+        Record the time since the newest trade when the response was received.
+        """
+
+        self._trade_stamp = (age, time.monotonic())
+
+    @property
+    def trades(self) -> tuple[Trade, ...]:
+        if self._trades is None:
+            self._trades = tuple(
+                Trade(i["time"], float(i["price"]), float(i["volume"]), i["type"])
+                for i in self._raw.get("trades", ()))
+        return self._trades
+
+
+class MarketStats(Model):
+    """
+    The market stats keyed by `"<source>-<destination>"`, e.g. `"btc-rls"`.
+    Each entry is only parsed when it is looked up.
+    """
+
+    __slots__ = ("_stats",)
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._stats = {}
+
+    def market(self, market: str) -> MarketStat:
+        """
+        Get the stats of a single market.
+
+        Args:
+            market: The market key, e.g. `"btc-rls"`.
+
+        Returns:
+            The `MarketStat` of the market.
+
+        Raises:
+            KeyError: If the market is not in the response.
+        """
+
+        stat = self._stats.get(market)
+        if stat is None:
+            i = self._raw["stats"][market]
+            stat = self._stats[market] = MarketStat(
+                bool(i.get("isClosed")),
+                _float(i.get("bestSell")),
+                _float(i.get("bestBuy")),
+                _float(i.get("volumeSrc")),
+                _float(i.get("volumeDst")),
+                _float(i.get("latest")),
+                _float(i.get("mark")),
+                _float(i.get("dayLow")),
+                _float(i.get("dayHigh")),
+                _float(i.get("dayOpen")),
+                _float(i.get("dayClose")),
+                _float(i.get("dayChange")))
+        return stat
+
+    def pair(self, source, destination) -> MarketStat:
+        """
+        Get the stats for a source and destination currency.
+
+        Args:
+            source: The source `Currency` (or its value).
+            destination: The destination `Currency` (or its value).
+
+        Returns:
+            The `MarketStat` of the pair.
+
+        Raises:
+            KeyError: If the pair is not in the response.
+        """
+
+        source = getattr(source, "value", source)
+        destination = getattr(destination, "value", destination)
+        return self.market(f"{source}-{destination}")
+
+
+class Wallets(Model):
+    """
+    The balances returned by `/v2/wallets`, keyed by upper-case currency, e.g. `"RLS"`.
+    """
+
+    __slots__ = ("_wallets",)
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._wallets = {}
+
+    def balance(self, currency) -> Balance:
+        """
+        Get the balance of a single currency.
+
+        Args:
+            currency: The `Currency` (or its value) to get the balance for.
+
+        Returns:
+            The `Balance` of the currency.
+
+        Raises:
+            KeyError: If the currency is not in the response.
+        """
+
+        currency = str(getattr(currency, "value", currency)).upper()
+        wallet = self._wallets.get(currency)
+        if wallet is None:
+            i = self._raw["wallets"][currency]
+            wallet = self._wallets[currency] = Balance(
+                i.get("id"), _float(i.get("balance")), _float(i.get("blocked")))
+        return wallet
+
+
+class WalletList(Model):
+    """
+    The full wallet entries returned by `/users/wallets/list`.
+    """
+
+    __slots__ = ("_wallets",)
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._wallets = None
+
+    @property
+    def wallets(self) -> tuple[Wallet, ...]:
+        if self._wallets is None:
+            self._wallets = tuple(
+                Wallet(
+                    i.get("id"),
+                    i.get("currency"),
+                    _float(i.get("balance")),
+                    _float(i.get("blockedBalance")),
+                    _float(i.get("activeBalance")),
+                    _float(i.get("rialBalance")),
+                    i.get("depositAddress"))
+                for i in self._raw.get("wallets", ()))
+        return self._wallets
+
+
+class Transactions(Model):
+    """
+    The latest transactions of a wallet.
+    """
+
+    __slots__ = ("_transactions",)
+
+    def __init__(self, raw: dict) -> None:
+        super().__init__(raw)
+        self._transactions = None
+
+    @property
+    def transactions(self) -> tuple[Transaction, ...]:
+        if self._transactions is None:
+            self._transactions = tuple(
+                Transaction(
+                    i.get("id"),
+                    i.get("currency"),
+                    _float(i.get("amount")),
+                    i.get("description"),
+                    i.get("created_at"),
+                    _float(i.get("calculatedFee")))
+                for i in self._raw.get("transactions", ()))
+        return self._transactions
@@ -0,0 +1,99 @@
+import json
+from decimal import Decimal
+
+from .markets import split_symbol
+from .utils import Symbol, OrderType, Execution
+
+
+def _number(value) -> str:
+    """
+    Format an amount or price the way the API expects it, without an exponent.
+    """
+
+    if isinstance(value, Decimal):
+        return format(value, "f")
+    if isinstance(value, int):
+        return str(value)
+    return format(Decimal(str(value)), "f")
+
+
+class OrderTemplate:
+    """
+    The pre-serialized JSON body of the orders of one symbol, side and execution.
+    Only the amount, price and client order ID are formatted when an order is placed.
+    """
+
+    __slots__ = ("prefix",)
+
+    def __init__(
+        self,
+        symbol,
+        side: OrderType,
+        execution: Execution
+        ) -> None:
+        source, destination = split_symbol(symbol.value)
+        self.prefix = json.dumps({
+            "type": side.value,
+            "execution": execution.value,
+            "srcCurrency": source,
+            "dstCurrency": destination}, separators=(",", ":"))[:-1]
+
+    def render(
+        self,
+        amount,
+        price=None,
+        client_order_id: str = None
+        ) -> bytes:
+        """
+        Build the request body of an order.
+
+        Args:
+            amount: The order amount.
+            price: The order price. Omitted from the body if `None`.
+            client_order_id: The client order ID. Omitted from the body if `None`.
+
+        Returns:
+            The JSON body as `bytes`.
+
+        Raises:
+            None
+        """
+
+        body = f'{self.prefix},"amount":"{_number(amount)}"'
+        if price is not None:
+            body += f',"price":"{_number(price)}"'
+        if client_order_id is not None:
+            body += f',"clientOrderId":{json.dumps(client_order_id)}'
+        return f"{body}}}".encode()
+
+
+_templates = {}
+
+
+def order_template(
+    symbol,
+    side: OrderType,
+    execution: Execution
+    ) -> OrderTemplate:
+    """
+    Get the cached template of a symbol, side and execution, building it on first use.
+
+    Args:
+        symbol: A `Symbol` or a `markets.Market`.
+        side: `OrderType.BUY` or `OrderType.SELL`.
+        execution: `Execution.LIMIT` or `Execution.MARKET`.
+
+    Returns:
+        The `OrderTemplate`.
+
+    Raises:
+        ValueError: If the symbol is `Symbol.ALL` or has no known quote currency.
+    """
+
+    key = (symbol.value, side, execution)
+    template = _templates.get(key)
+    if template is None:
+        if symbol == Symbol.ALL:
+            raise ValueError("Can't place an order on `Symbol.ALL`.")
+        template = _templates[key] = OrderTemplate(symbol, side, execution)
+    return template
@@ -0,0 +1,472 @@
+"""
+Paper trading against live or recorded order book and trade data.
+
+The engine keeps the order book sides as NumPy arrays. Incoming orders sweep the opposite side
+in one vectorized pass, and resting simulated orders are filled with price-time priority by
+the book and the public trades that move through their price. Needs `numpy`.
+"""
+
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("The paper trading engine needs `numpy`. Install it with `pip install numpy`.") from None
+
+from .markets import split_symbol
+from .models import Model, OrderBook, Trade, Trades, Wallets
+from .utils import OrderType, Execution
+
+BUY = 1
+SELL = -1
+
+
+class Fill(NamedTuple):
+    """
+    A single simulated fill.
+    """
+
+    order_id: int
+    side: OrderType
+    price: float
+    amount: float
+
+
+def _sides(book) -> tuple:
+    if isinstance(book, dict):
+        book = OrderBook(book)
+    if isinstance(book, Model):
+        raw = book.to_dict()
+        asks, bids = raw.get("asks", ()), raw.get("bids", ())
+    else:
+        asks, bids = book.asks, book.bids
+    asks = np.asarray(asks, dtype=np.float64).reshape(-1, 2)
+    bids = np.asarray(bids, dtype=np.float64).reshape(-1, 2)
+    asks = asks[np.argsort(asks[:, 0], kind="stable")]
+    bids = bids[np.argsort(-bids[:, 0], kind="stable")]
+    return asks[:, 0].copy(), asks[:, 1].copy(), bids[:, 0].copy(), bids[:, 1].copy()
+
+
+def _allocate(amounts: np.ndarray, volume: float) -> np.ndarray:
+    """
+    Split a volume over the queue `amounts` in order, filling each entry before the next one.
+    """
+
+    before = np.cumsum(amounts) - amounts
+    return np.clip(volume - before, 0.0, amounts)
+
+
+class PaperEngine:
+    """
+    A simulated exchange for one symbol with its own wallets.
+    """
+
+    def __init__(
+        self,
+        symbol,
+        balances: dict,
+        fee: float = 0.0
+        ) -> None:
+        """
+        Sets up the engine with an empty book.
+
+        Args:
+            symbol: The `Symbol` (or `markets.Market`) to trade.
+            balances: The starting balances keyed by currency, e.g. `{Currency.rls: 1e9}`.
+            fee: The fee rate taken from the received currency of every fill. Defaults to `0`.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the symbol has no known quote currency.
+        """
+
+        self.symbol = symbol
+        self.source, self.destination = split_symbol(symbol.value)
+        self.fee = fee
+        self.fills = []
+        self.__balances = {}
+        for currency, balance in balances.items():
+            self.__balances[getattr(currency, "value", currency)] = [float(balance), 0.0]
+        for currency in (self.source, self.destination):
+            self.__balances.setdefault(currency, [0.0, 0.0])
+        self.__ask_prices = self.__ask_amounts = np.empty(0)
+        self.__bid_prices = self.__bid_amounts = np.empty(0)
+        self.__next_id = 1
+        # The resting orders, in submission (time priority) order
+        self.__ids = np.empty(0, dtype=np.int64)
+        self.__order_sides = np.empty(0, dtype=np.int8)
+        self.__prices = np.empty(0)
+        self.__remaining = np.empty(0)
+        # The time of the newest trade seen so far and the trades seen at that time
+        self.__last_trade_time = -np.inf
+        self.__last_trades = Counter()
+
+    # Market data
+
+    def process(self, event) -> None:
+        """
+        Apply a market data event: an order book or a batch of trades.
+
+        Args:
+            event: An `OrderBook`, a `recorder.BookSnapshot`, a raw order book `dict`, \
+a `Trades`, a raw trades `dict` (with a `"trades"` key) or an iterable of `Trade`s.
+
+        Returns:
+            None
+
+        Raises:
+            TypeError: If the event is neither an order book nor trades.
+        """
+
+        if isinstance(event, Trades):
+            self.on_trades(event)
+        elif isinstance(event, Mapping) and "trades" in event:
+            self.on_trades(Trades(dict(event)))
+        elif isinstance(event, Mapping) and ("asks" in event or "bids" in event):
+            self.on_book(event)
+        elif hasattr(event, "asks") and hasattr(event, "bids"):
+            self.on_book(event)
+        elif isinstance(event, Iterable) and not isinstance(event, (str, bytes, Mapping)):
+            trades = list(event)
+            if not all(isinstance(i, Trade) for i in trades):
+                raise TypeError("Trade events must only contain `Trade`s.")
+            self.on_trades(trades)
+        else:
+            raise TypeError(f"Can't apply a `{type(event).__name__}` as an order book or trades.")
+
+    def on_book(self, book) -> None:
+        """
+        Replace the simulated book, then fill the resting orders the new book crosses.
+        """
+
+        self.__ask_prices, self.__ask_amounts, self.__bid_prices, self.__bid_amounts = _sides(book)
+        if not len(self.__ids):
+            return
+        crossed = (
+            ((self.__order_sides == BUY) & (self.__prices >= self.best_ask))
+            | ((self.__order_sides == SELL) & (self.__prices <= self.best_bid)))
+        crossed = np.flatnonzero(crossed)
+        # Better priced orders first, then older ones
+        priority = np.lexsort((self.__ids[crossed], -self.__prices[crossed] * self.__order_sides[crossed]))
+        for i in crossed[priority]:
+            side = int(self.__order_sides[i])
+            prices, amounts = self.__sweep(side, self.__prices[i], self.__remaining[i])
+            self.__fill_resting(i, prices, amounts)
+        self.__drop_filled()
+
+    def on_trades(self, trades) -> None:
+        """
+        Fill the resting orders that public trades printed through, in price-time priority.
+        A trade at or below a buy price (or at or above a sell price) fills the resting orders \
+at their own limit price, up to the trade volume. A `"sell"` trade only fills resting buys \
+and a `"buy"` trade only fills resting sells.
+        Trades that an earlier call already saw are skipped, so overlapping `get_trades` \
+snapshots can be passed as they are.
+        """
+
+        if isinstance(trades, Trades):
+            trades = trades.trades
+        for trade in self.__new_trades(trades):
+            sides = {"sell": (BUY,), "buy": (SELL,)}.get(trade.type, (BUY, SELL))
+            for side in sides:
+                if side == BUY:
+                    eligible = np.flatnonzero((self.__order_sides == BUY) & (self.__prices >= trade.price))
+                    order = np.lexsort((self.__ids[eligible], -self.__prices[eligible]))
+                else:
+                    eligible = np.flatnonzero((self.__order_sides == SELL) & (self.__prices <= trade.price))
+                    order = np.lexsort((self.__ids[eligible], self.__prices[eligible]))
+                if not len(eligible):
+                    continue
+                queue = eligible[order]
+                allocated = _allocate(self.__remaining[queue], trade.volume)
+                for i, amount in zip(queue[allocated > 0], allocated[allocated > 0]):
+                    self.__fill_resting(i, self.__prices[i:i + 1], np.array([amount]))
+        self.__drop_filled()
+
+    @property
+    def best_ask(self) -> float:
+        return self.__ask_prices[0] if len(self.__ask_prices) else np.inf
+
+    @property
+    def best_bid(self) -> float:
+        return self.__bid_prices[0] if len(self.__bid_prices) else -np.inf
+
+    # Orders
+
+    def submit(
+        self,
+        side: OrderType,
+        amount: float,
+        price: float = None,
+        execution: Execution = Execution.LIMIT
+        ) -> int:
+        """
+        Submit an order. The marketable part is filled against the book right away, \
+the rest of a limit order rests and the rest of a market order is dropped.
+
+        Args:
+            side: `OrderType.BUY` or `OrderType.SELL`.
+            amount: The order amount in the source currency.
+            price: The limit price. Required for limit orders.
+            execution: `Execution.LIMIT` or `Execution.MARKET`. Defaults to `Execution.LIMIT`.
+
+        Returns:
+            The simulated order ID.
+
+        Raises:
+            ValueError: If the order is malformed or the wallet can't cover it.
+        """
+
+        amount = float(amount)
+        if amount <= 0:
+            raise ValueError(f"The amount must be positive, got `{amount}`.")
+        if execution == Execution.LIMIT:
+            if price is None or price <= 0:
+                raise ValueError("Limit orders need a positive price.")
+            limit = float(price)
+        else:
+            limit = np.inf if side == OrderType.BUY else -np.inf
+        side = BUY if side == OrderType.BUY else SELL
+        prices, amounts = self.__sweep(side, limit, amount, consume=False)
+        taken = amounts.sum()
+        resting = amount - taken if execution == Execution.LIMIT else 0.0
+        if side == BUY:
+            need = float(prices @ amounts) + resting * (limit if resting else 0.0)
+            currency = self.destination
+        else:
+            need = taken + resting
+            currency = self.source
+        if need > self.available(currency) + 1e-12:
+            raise ValueError(f"Insufficient {currency} balance for the order.")
+        order_id = self.__next_id
+        self.__next_id += 1
+        if taken:
+            self.__sweep(side, limit, amount)
+            self.__settle(order_id, side, prices, amounts)
+        if resting > 1e-12:
+            self.__ids = np.append(self.__ids, order_id)
+            self.__order_sides = np.append(self.__order_sides, np.int8(side))
+            self.__prices = np.append(self.__prices, limit)
+            self.__remaining = np.append(self.__remaining, resting)
+            if side == BUY:
+                self.__balances[self.destination][1] += resting * limit
+            else:
+                self.__balances[self.source][1] += resting
+        return order_id
+
+    def cancel(self, order_id: int) -> bool:
+        """
+        Cancel a resting order and release its blocked balance.
+
+        Args:
+            order_id: The simulated order ID.
+
+        Returns:
+            Whether a resting order was cancelled.
+
+        Raises:
+            None
+        """
+
+        found = np.flatnonzero(self.__ids == order_id)
+        if not len(found):
+            return False
+        i = found[0]
+        if self.__order_sides[i] == BUY:
+            self.__balances[self.destination][1] -= self.__remaining[i] * self.__prices[i]
+        else:
+            self.__balances[self.source][1] -= self.__remaining[i]
+        self.__remaining[i] = 0.0
+        self.__drop_filled()
+        return True
+
+    @property
+    def open_orders(self) -> list:
+        """
+        The resting orders as `(order_id, side, price, remaining)` tuples in time priority.
+        """
+
+        return [
+            (int(i), OrderType.BUY if side == BUY else OrderType.SELL, float(price), float(remaining))
+            for i, side, price, remaining in zip(
+                self.__ids, self.__order_sides, self.__prices, self.__remaining)]
+
+    # Wallets
+
+    def available(self, currency) -> float:
+        balance, blocked = self.__balances.get(getattr(currency, "value", currency), (0.0, 0.0))
+        return balance - blocked
+
+    def wallets(self) -> Wallets:
+        """
+        Get the simulated wallets in the shape `Client.get_wallets` returns.
+
+        Args:
+            None
+
+        Returns:
+            `Wallets` with the balance and blocked amount of every currency.
+
+        Raises:
+            None
+        """
+
+        return Wallets({
+            "status": "ok",
+            "wallets": {
+                currency.upper(): {"id": i, "balance": str(float(balance)), "blocked": str(float(blocked))}
+                for i, (currency, (balance, blocked)) in enumerate(self.__balances.items(), 1)}})
+
+    # Matching
+
+    def __sweep(
+        self,
+        side: int,
+        limit: float,
+        amount: float,
+        consume: bool = True
+        ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the opposite levels an order of `amount` up to `limit` would take, best first.
+        With `consume`, the taken liquidity is removed from the book until the next book update.
+        """
+
+        if side == BUY:
+            prices, amounts = self.__ask_prices, self.__ask_amounts
+            depth = np.searchsorted(prices, limit, side="right")
+        else:
+            prices, amounts = self.__bid_prices, self.__bid_amounts
+            depth = np.searchsorted(-prices, -limit, side="right")
+        taken = _allocate(amounts[:depth], amount)
+        used = taken > 0
+        if consume and used.any():
+            left = amounts.copy()
+            left[:depth] -= taken
+            keep = left > 1e-12
+            if side == BUY:
+                self.__ask_prices, self.__ask_amounts = prices[keep], left[keep]
+            else:
+                self.__bid_prices, self.__bid_amounts = prices[keep], left[keep]
+        return prices[:depth][used], taken[used]
+
+    def __settle(self, order_id: int, side: int, prices: np.ndarray, amounts: np.ndarray) -> None:
+        quantity = float(amounts.sum())
+        value = float(prices @ amounts)
+        source, destination = self.__balances[self.source], self.__balances[self.destination]
+        if side == BUY:
+            destination[0] -= value
+            source[0] += quantity * (1 - self.fee)
+        else:
+            source[0] -= quantity
+            destination[0] += value * (1 - self.fee)
+        order_side = OrderType.BUY if side == BUY else OrderType.SELL
+        self.fills.extend(
+            Fill(order_id, order_side, float(price), float(amount))
+            for price, amount in zip(prices, amounts))
+
+    def __fill_resting(self, i: int, prices: np.ndarray, amounts: np.ndarray) -> None:
+        quantity = float(amounts.sum())
+        if not quantity:
+            return
+        side = int(self.__order_sides[i])
+        # Release the part of the blocked balance that backed the filled amount
+        if side == BUY:
+            self.__balances[self.destination][1] -= quantity * self.__prices[i]
+        else:
+            self.__balances[self.source][1] -= quantity
+        self.__remaining[i] -= quantity
+        self.__settle(int(self.__ids[i]), side, prices, amounts)
+
+    def __drop_filled(self) -> None:
+        keep = self.__remaining > 1e-12
+        if keep.all():
+            return
+        self.__ids = self.__ids[keep]
+        self.__order_sides = self.__order_sides[keep]
+        self.__prices = self.__prices[keep]
+        self.__remaining = self.__remaining[keep]
+
+    def __new_trades(self, trades) -> list:
+        """
+        Get the trades newer than the ones already processed, oldest first.
+        """
+
+        trades = sorted(trades, key=lambda i: i.time)
+        if not trades:
+            return []
+        seen = Counter()
+        new = []
+        for trade in trades:
+            if trade.time < self.__last_trade_time:
+                continue
+            if trade.time == self.__last_trade_time:
+                key = (trade.price, trade.volume, trade.type)
+                seen[key] += 1
+                if seen[key] <= self.__last_trades[key]:
+                    continue
+            new.append(trade)
+        last = Counter(
+            (i.price, i.volume, i.type) for i in trades if i.time == trades[-1].time)
+        if trades[-1].time == self.__last_trade_time:
+            self.__last_trades |= last
+        elif trades[-1].time > self.__last_trade_time:
+            self.__last_trade_time, self.__last_trades = trades[-1].time, last
+        return new
+
+
+# The events of a sweep, sent to each worker process once when it starts
+_events = None
+
+
+def _load_events(events: list) -> None:
+    global _events
+    _events = events
+
+
+def _run_one(strategy, symbol, balances: dict, fee: float, params: dict):
+    engine = PaperEngine(symbol, balances, fee)
+    for event in _events:
+        engine.process(event)
+        strategy(engine, event, **params)
+    return params, engine.wallets()
+
+
+def run_sweep(
+    strategy,
+    grid: list,
+    events: list,
+    symbol,
+    balances: dict,
+    fee: float = 0.0,
+    processes: int = None
+    ) -> list:
+    """
+    Replay the same events for every parameter set of a strategy on a process pool.
+    The events are sent to each worker once, and only the parameter sets are sent per run.
+
+    Args:
+        strategy: A module-level function called as `strategy(engine, event, **params)` \
+after each event is applied to the engine.
+        grid: The parameter sets as a `list` of `dict`s.
+        events: The market data events (see `PaperEngine.process`).
+        symbol: The `Symbol` to trade.
+        balances: The starting balances of every run.
+        fee: The fee rate of every run. Defaults to `0`.
+        processes: The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        A `list` of `(params, Wallets)` with the final wallets of every run, in the order of `grid`.
+
+    Raises:
+        None
+    """
+
+    run = partial(_run_one, strategy, symbol, balances, fee)
+    with ProcessPoolExecutor(processes, initializer=_load_events, initargs=(events,)) as pool:
+        return list(pool.map(run, grid))
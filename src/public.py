@@ -0,0 +1,97 @@
+"""
+A lightweight, synchronous entry point for the public market data endpoints.
+
+Importing this module doesn't import `aiohttp`, `asyncio` or the enums in `utils`, only
+`http.client`, `json` and the response models. It is meant for short-lived scripts that
+fetch a few prices, e.g.:
+
+    from src.public import get_market_stats
+    print(get_market_stats("btc", destination_currency="rls").pair("btc", "rls").latest)
+
+The `Symbol` and `Currency` members can be passed as well as their string values.
+"""
+
+import http.client
+import json
+from urllib.parse import urlencode
+
+from .models import OrderBook, OrderBooks, MarketStats
+
+HOST = "api.nobitex.ir"
+TIMEOUT = 10
+
+# The same paths as `Path.GET_ORDER_BOOK` and `Path.GET_MARKET_STATS`
+ORDER_BOOK_PATH = "/v2/orderbook/"
+MARKET_STATS_PATH = "/market/stats"
+
+
+def _get(path: str, params: dict = None, timeout: float = TIMEOUT) -> dict:
+    """
+    Send a GET request on a new HTTPS connection and decode the JSON response.
+    """
+
+    if params:
+        path = f"{path}?{urlencode(params)}"
+    connection = http.client.HTTPSConnection(HOST, timeout=timeout)
+    try:
+        connection.request("GET", path, headers={"Accept": "application/json"})
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def get_order_book(symbol, timeout: float = TIMEOUT) -> OrderBook | OrderBooks:
+    """
+    Get the order book for a given symbol or all the available symbols.
+
+    Rate limit: 60/min
+    Token: Not required
+
+    Args:
+        symbol: The `Symbol` or its value, e.g. `'BTCIRT'`. Use `'all'` for all symbols.
+        timeout: The connection timeout in seconds. Defaults to `10`.
+
+    Returns:
+        The order book data as an `OrderBook`, or as an `OrderBooks` for all symbols.
+
+    Raises:
+        None
+    """
+
+    symbol = getattr(symbol, "value", symbol)
+    response = _get(f"{ORDER_BOOK_PATH}{symbol}", timeout=timeout)
+    if symbol == "all":
+        return OrderBooks(response)
+    return OrderBook(response)
+
+
+def get_market_stats(
+    *source_currency,
+    destination_currency,
+    timeout: float = TIMEOUT
+    ) -> MarketStats:
+    """
+    Get the latest market stats for one/multiple source(s) and one destination currency.
+
+    Rate limit: 100/min
+    Token: Not required
+
+    Args:
+        source_currency: The source `Currency`/currencies or their values.
+        destination_currency: The destination `Currency` or its value.
+        timeout: The connection timeout in seconds. Defaults to `10`.
+
+    Returns:
+        The market stats as a `MarketStats`.
+
+    Raises:
+        None
+    """
+
+    sources = ",".join(getattr(i, "value", i) for i in source_currency)
+    return MarketStats(_get(
+        MARKET_STATS_PATH,
+        params={
+            "srcCurrency": sources,
+            "dstCurrency": getattr(destination_currency, "value", destination_currency)},
+        timeout=timeout))
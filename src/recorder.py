@@ -0,0 +1,408 @@
+"""
+Record order book snapshots in a compact binary format and replay them.
+
+Every symbol is stored in two files inside the recorder directory:
+
+- `<SYMBOL>.book`: the header `MAGIC` followed by the records. A record is a `RECORD` header
+  (kind, timestamp, payload length) and a zlib-compressed payload holding the ask and bid levels
+  as `float64` `(price, amount)` pairs. A keyframe holds the whole book, a delta only holds the
+  levels that changed since the previous snapshot, with an amount of `0` for removed levels.
+- `<SYMBOL>.idx`: one fixed-size `INDEX` entry (timestamp, offset, kind) per record,
+  so a reader can binary search it in place.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from .models import OrderBook, PriceLevel
+
+MAGIC = b"NBXBOOK1"
+KEYFRAME = 0
+DELTA = 1
+RECORD = struct.Struct("<BqI")
+INDEX = struct.Struct("<qQB")
+COUNTS = struct.Struct("<II")
+
+
+def _pack_levels(levels: dict) -> array:
+    values = array("d")
+    for price, amount in levels.items():
+        values.append(price)
+        values.append(amount)
+    return values
+
+
+def _encode(asks: dict, bids: dict, level: int) -> bytes:
+    ask_values, bid_values = _pack_levels(asks), _pack_levels(bids)
+    if sys.byteorder == "big":
+        ask_values.byteswap()
+        bid_values.byteswap()
+    payload = COUNTS.pack(len(asks), len(bids)) + ask_values.tobytes() + bid_values.tobytes()
+    return zlib.compress(payload, level)
+
+
+def _decode(payload: bytes) -> tuple[array, array]:
+    payload = zlib.decompress(payload)
+    ask_count, bid_count = COUNTS.unpack_from(payload)
+    values = array("d")
+    values.frombytes(payload[COUNTS.size:])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values[:ask_count * 2], values[ask_count * 2:]
+
+
+def _diff(previous: dict, current: dict) -> dict:
+    changes = {price: amount for price, amount in current.items() if previous.get(price) != amount}
+    changes.update((price, 0.0) for price in previous if price not in current)
+    return changes
+
+
+def _apply(levels: dict, values: array) -> None:
+    for i in range(0, len(values), 2):
+        if values[i + 1]:
+            levels[values[i]] = values[i + 1]
+        else:
+            levels.pop(values[i], None)
+
+
+class BookSnapshot:
+    """
+    An order book rebuilt from a recording.
+    Asks are sorted by ascending and bids by descending price, like the `OrderBook` levels.
+    """
+
+    __slots__ = ("timestamp", "asks", "bids")
+
+    def __init__(
+        self,
+        timestamp: int,
+        asks: tuple[PriceLevel, ...],
+        bids: tuple[PriceLevel, ...]
+        ) -> None:
+        self.timestamp = timestamp
+        self.asks = asks
+        self.bids = bids
+
+    def __repr__(self) -> str:
+        return f"BookSnapshot(timestamp={self.timestamp}, asks={len(self.asks)}, bids={len(self.bids)})"
+
+    @property
+    def last_update(self) -> int:
+        return self.timestamp
+
+    @classmethod
+    def from_levels(cls, timestamp: int, asks: dict, bids: dict) -> "BookSnapshot":
+        return cls(
+            timestamp,
+            tuple(PriceLevel(price, asks[price]) for price in sorted(asks)),
+            tuple(PriceLevel(price, bids[price]) for price in sorted(bids, reverse=True)))
+
+
+class _SymbolWriter:
+    """
+    The open files and the last written book of one symbol.
+    """
+
+    def __init__(self, directory: str, symbol: str) -> None:
+        data_path = os.path.join(directory, f"{symbol}.book")
+        index_path = os.path.join(directory, f"{symbol}.idx")
+        self.data = open(data_path, "ab")
+        self.index = open(index_path, "ab")
+        if self.data.tell() == 0:
+            self.data.write(MAGIC)
+        # Drop a trailing index entry that was only partly written
+        self.index.truncate(self.index.tell() - self.index.tell() % INDEX.size)
+        self.last_timestamp = None
+        if self.index.tell():
+            with open(index_path, "rb") as file:
+                file.seek(-INDEX.size, os.SEEK_END)
+                self.last_timestamp = INDEX.unpack(file.read(INDEX.size))[0]
+        # The first record after opening is always a keyframe
+        self.asks = None
+        self.bids = None
+        self.since_keyframe = 0
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+
+class BookRecorder:
+    """
+    Appends order book snapshots per symbol, delta-encoded against the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        keyframe_interval: int = 100,
+        compression_level: int = 6
+        ) -> None:
+        """
+        Sets up the recorder. Existing recordings in `directory` are appended to.
+
+        Args:
+            directory: The directory to write the recordings to.
+            keyframe_interval: The number of snapshots between two keyframes. Defaults to `100`.
+            compression_level: The zlib compression level of the records. Defaults to `6`.
+
+        Returns:
+            None
+
+        Raises:
+            None
+        """
+
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+        self.__writers = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "BookRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def append(
+        self,
+        symbol,
+        book,
+        timestamp: int = None
+        ) -> None:
+        """
+        Append a snapshot to the recording of a symbol.
+
+        Args:
+            symbol: The `Symbol` (or its value) the book belongs to.
+            book: An `OrderBook` from `get_order_book`/`get_market_depth`, \
+a `BookSnapshot` or the raw response `dict`.
+            timestamp: The snapshot time in unix milliseconds. \
+Defaults to the `lastUpdate` of the book, or the current time.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the timestamp is older than the last recorded snapshot.
+        """
+
+        symbol = getattr(symbol, "value", symbol)
+        if isinstance(book, dict):
+            book = OrderBook(book)
+        if timestamp is None:
+            timestamp = book.last_update or int(time.time() * 1000)
+        writer = self.__writers.get(symbol)
+        if writer is None:
+            writer = self.__writers[symbol] = _SymbolWriter(self.directory, symbol)
+        if writer.last_timestamp is not None and timestamp < writer.last_timestamp:
+            raise ValueError(
+                f"The {symbol} snapshot at {timestamp} is older than the last recorded one \
+at {writer.last_timestamp}.")
+        asks = {float(price): float(amount) for price, amount in book.asks}
+        bids = {float(price): float(amount) for price, amount in book.bids}
+        if writer.asks is None or writer.since_keyframe >= self.keyframe_interval:
+            kind = KEYFRAME
+            payload = _encode(asks, bids, self.compression_level)
+            writer.since_keyframe = 0
+        else:
+            kind = DELTA
+            payload = _encode(
+                _diff(writer.asks, asks), _diff(writer.bids, bids), self.compression_level)
+        offset = writer.data.tell()
+        writer.data.write(RECORD.pack(kind, timestamp, len(payload)))
+        writer.data.write(payload)
+        writer.index.write(INDEX.pack(timestamp, offset, kind))
+        writer.asks, writer.bids = asks, bids
+        writer.since_keyframe += 1
+        writer.last_timestamp = timestamp
+
+    def flush(self) -> None:
+        """
+        Flush the buffered records of every symbol to disk.
+        The data file is flushed before the index, so the index never points past the data.
+        """
+
+        for writer in self.__writers.values():
+            writer.data.flush()
+            writer.index.flush()
+
+    def close(self) -> None:
+        """
+        Flush and close the files of every symbol.
+        """
+
+        self.flush()
+        for writer in self.__writers.values():
+            writer.close()
+        self.__writers.clear()
+
+
+class _IndexView:
+    """
+    A read-only sequence of the timestamps in a memory-mapped index, for `bisect`.
+    """
+
+    def __init__(self, index, length: int) -> None:
+        self.index = index
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i: int) -> int:
+        return INDEX.unpack_from(self.index, i * INDEX.size)[0]
+
+
+class BookReader:
+    """
+    Rebuilds the recorded order books of one symbol from memory-mapped files.
+    Only the records between the nearest keyframe and the requested time are decoded.
+    Snapshots appended after the reader was opened are not visible to it.
+    """
+
+    def __init__(self, directory: str, symbol) -> None:
+        """
+        Opens the recording of a symbol.
+
+        Args:
+            directory: The directory the `BookRecorder` wrote to.
+            symbol: The `Symbol` (or its value) to read.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the file is not a book recording.
+        """
+
+        symbol = getattr(symbol, "value", symbol)
+        self.symbol = symbol
+        self.__files = []
+        self.__data = self.__map(os.path.join(directory, f"{symbol}.book"))
+        self.__index = self.__map(os.path.join(directory, f"{symbol}.idx"))
+        if self.__data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"`{symbol}.book` is not a book recording.")
+        self.__length = len(self.__index) // INDEX.size
+        self.__timestamps = _IndexView(self.__index, self.__length)
+
+    def __map(self, path: str):
+        file = open(path, "rb")
+        self.__files.append(file)
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__files.append(mapped)
+        return mapped
+
+    def __enter__(self) -> "BookReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def close(self) -> None:
+        """
+        Unmap and close the files.
+        """
+
+        for file in reversed(self.__files):
+            file.close()
+        self.__files.clear()
+
+    @property
+    def start(self) -> int:
+        return self.__timestamps[0] if self.__length else None
+
+    @property
+    def end(self) -> int:
+        return self.__timestamps[self.__length - 1] if self.__length else None
+
+    def __entry(self, i: int) -> tuple[int, int, int]:
+        return INDEX.unpack_from(self.__index, i * INDEX.size)
+
+    def __record(self, offset: int) -> tuple[array, array]:
+        length = RECORD.unpack_from(self.__data, offset)[2]
+        start = offset + RECORD.size
+        return _decode(self.__data[start:start + length])
+
+    def __rebuild(self, i: int) -> tuple[dict, dict]:
+        """
+        Decode the records from the last keyframe up to and including record `i`.
+        """
+
+        first = i
+        while self.__entry(first)[2] != KEYFRAME:
+            first -= 1
+        asks, bids = {}, {}
+        for j in range(first, i + 1):
+            ask_values, bid_values = self.__record(self.__entry(j)[1])
+            _apply(asks, ask_values)
+            _apply(bids, bid_values)
+        return asks, bids
+
+    def book_at(self, timestamp: int) -> BookSnapshot | None:
+        """
+        Get the book as it was at the given time.
+
+        Args:
+            timestamp: The time in unix milliseconds.
+
+        Returns:
+            The last `BookSnapshot` recorded at or before `timestamp`, \
+or `None` if the recording starts later.
+
+        Raises:
+            None
+        """
+
+        i = bisect.bisect_right(self.__timestamps, timestamp) - 1
+        if i < 0:
+            return None
+        asks, bids = self.__rebuild(i)
+        return BookSnapshot.from_levels(self.__entry(i)[0], asks, bids)
+
+    def iter_range(
+        self,
+        start: int = None,
+        end: int = None
+        ):
+        """
+        Iterate over the recorded snapshots between two times.
+
+        Args:
+            start: The first time to include, in unix milliseconds. Defaults to the first snapshot.
+            end: The last time to include, in unix milliseconds. Defaults to the last snapshot.
+
+        Returns:
+            An iterator of `BookSnapshot`s in recording order.
+
+        Raises:
+            None
+        """
+
+        first = 0 if start is None else bisect.bisect_left(self.__timestamps, start)
+        last = self.__length if end is None else bisect.bisect_right(self.__timestamps, end)
+        if first >= last:
+            return
+        asks, bids = self.__rebuild(first)
+        yield BookSnapshot.from_levels(self.__entry(first)[0], asks, bids)
+        for i in range(first + 1, last):
+            timestamp, offset, kind = self.__entry(i)
+            if kind == KEYFRAME:
+                asks, bids = {}, {}
+            ask_values, bid_values = self.__record(offset)
+            _apply(asks, ask_values)
+            _apply(bids, bid_values)
+            yield BookSnapshot.from_levels(timestamp, asks, bids)
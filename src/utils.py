@@ -104,6 +104,7 @@ class Path(Enum):
     GET_MARKET_STATS = "/market/stats"
     OHLCV = "/market/udf/history"
     GET_GLOBAL_MARKET_STATS = "/market/global-stats"
+    GET_OPTIONS = "/v2/options"
     
     # User info
     GET_USER_PROFILE = "/users/profile"
@@ -118,6 +119,11 @@ class Path(Enum):
     GET_DEPOSITS_LIST = "/users/wallets/deposits/list"
     FAVORITE_MARKETS = "/users/markets/favorite"
     
+    # Orders
+    PLACE_ORDER = "/market/orders/add"
+    GET_ORDER_STATUS = "/market/orders/status"
+    UPDATE_ORDER_STATUS = "/market/orders/update-status"
+    
 class Resolution(Enum):
 
     _1MIN = '1'
@@ -137,7 +143,18 @@ class TradeType(Enum):
 
     SPOT = "spot"
     MARGIN = "margin"
+    
+class OrderType(Enum):
+
+    BUY = "buy"
+    SELL = "sell"
+    
+class Execution(Enum):
+
+    LIMIT = "limit"
+    MARKET = "market"
 
 
 RESTAPIRequestType = Literal["GET", "POST", "PUT", "DELETE"]
+StalePolicy = Literal["refetch", "raise"]
 